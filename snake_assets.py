@@ -0,0 +1,189 @@
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+# Папка с изображениями рядом с модулем: каждое изображение - отдельный
+# спрайт с именем файла без расширения
+GRAPHICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'Graphics')
+
+# Заголовок файла с готовым атласом: метка, версия, размер спрайта,
+# число углов поворота и длина списка имен
+ATLAS_MAGIC = b'SNKA'
+ATLAS_VERSION = 1
+ATLAS_HEADER = struct.Struct('<4sBHHH')
+
+# Формат пикселей атласа совпадает с форматом convert_alpha, поэтому
+# атлас из файла не нужно конвертировать перед выводом на экран
+ATLAS_PIXEL_FORMAT = 'BGRA'
+
+
+def sprite_files(directory=GRAPHICS_DIR):
+    """Изображения из папки: имя спрайта -> путь к файлу."""
+    return {
+        os.path.splitext(name)[0]: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith('.png')
+    }
+
+
+class AssetManager:
+    """Все спрайты игры в одном атласе.
+
+    Атлас собирается один раз и только при первом обращении: в строке
+    атласа лежат все спрайты, повернутые на один угол из angles, в колонке
+    - один спрайт под всеми углами. Спрайты выдаются как подповерхности
+    атласа и кэшируются. Атлас масштабируется под размер ячейки тоже один
+    раз, а не при каждом выводе.
+    """
+
+    def __init__(self, files=None, angles=(0,), size=None, atlas_file=None):
+        # Изображения спрайтов, None - папка читается при сборке атласа
+        self.files = files
+        # Готовый атлас, который загружается вместо изображений, если есть
+        self.atlas_file = atlas_file
+        self.angles = tuple(angles)
+        self.size = size
+        self.names = None if files is None else list(files)
+        # Атлас в исходном размере, из него делается масштабированный
+        self.source = None
+        self.atlas = None
+        self.sprites = {}
+        # Отображение файла атласа в память, пока атлас из него используется
+        self.mapping = None
+        # Переведен ли собранный атлас в формат окна
+        self.converted = False
+
+    def sprite(self, name, angle=0):
+        """Спрайт, повернутый на угол angle."""
+        key = name, angle
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            atlas = self.load()
+            size = self.size
+            rect = pygame.Rect(self.names.index(name) * size,
+                               self.angles.index(angle) * size, size, size)
+            sprite = self.sprites[key] = atlas.subsurface(rect)
+        return sprite
+
+    def load(self):
+        """Атлас, который собирается из изображений при первом вызове."""
+        if self.atlas is None:
+            if self.atlas_file and os.path.exists(self.atlas_file):
+                self.load_atlas(self.atlas_file)
+            else:
+                self.source = self.build()
+                self.scale()
+        return self.atlas
+
+    def build(self):
+        """Сборка атласа в исходном размере изображений."""
+        if self.files is None:
+            self.files = sprite_files()
+            self.names = list(self.files)
+        images = [pygame.image.load(self.files[name]) for name in self.names]
+        size = max(max(image.get_size()) for image in images)
+        if self.size is None:
+            self.size = size
+        atlas = pygame.Surface((size * len(images), size * len(self.angles)),
+                               pygame.SRCALPHA)
+        for column, image in enumerate(images):
+            for row, angle in enumerate(self.angles):
+                rotated = pygame.transform.rotate(image, angle)
+                atlas.blit(rotated, rotated.get_rect(
+                    center=(column * size + size // 2,
+                            row * size + size // 2)))
+        return atlas
+
+    def convert(self):
+        """Перевод собранного атласа в формат окна.
+
+        Вызывается в основном потоке после открытия окна, поэтому сборка
+        в фоновом потоке не обращается к окну. Атлас из файла уже в
+        формате окна и не копируется.
+        """
+        if self.source is None or self.mapping is not None or self.converted:
+            return
+        self.source = self.source.convert_alpha()
+        self.converted = True
+        self.scale()
+
+    def scale(self):
+        """Масштабирование атласа под размер спрайта self.size."""
+        width, height = self.source.get_size()
+        source_size = height // len(self.angles)
+        if source_size == self.size:
+            self.atlas = self.source
+        else:
+            self.atlas = pygame.transform.smoothscale(
+                self.source,
+                (width // source_size * self.size,
+                 len(self.angles) * self.size))
+        self.sprites.clear()
+
+    def set_size(self, size):
+        """Новый размер спрайтов, например после смены GRID_SIZE.
+
+        Выданные раньше спрайты остаются в старом размере, их нужно
+        запросить заново.
+        """
+        if size != self.size:
+            self.size = size
+            if self.source is not None:
+                self.scale()
+
+    def save(self, path):
+        """Сохранение атласа в файл для загрузки без декодирования PNG."""
+        atlas = self.load()
+        names = ','.join(self.names).encode()
+        with open(path, 'wb') as file:
+            file.write(ATLAS_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION,
+                                         self.size, len(self.angles),
+                                         len(names)))
+            file.write(names)
+            file.write(struct.pack(f'<{len(self.angles)}H', *self.angles))
+            file.write(pygame.image.tobytes(atlas, ATLAS_PIXEL_FORMAT))
+
+    def load_atlas(self, path):
+        """Загрузка атласа из файла без копирования пикселей.
+
+        Файл отображается в память, и поверхность атласа использует эту
+        память напрямую.
+        """
+        with open(path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, angles, names_length = (
+            ATLAS_HEADER.unpack_from(mapping))
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+            mapping.close()
+            raise ValueError(f'Файл {path} не содержит атлас спрайтов.')
+        offset = ATLAS_HEADER.size
+        names = bytes(mapping[offset:offset + names_length]).decode()
+        offset += names_length
+        self.angles = struct.unpack_from(f'<{angles}H', mapping, offset)
+        offset += 2 * angles
+        self.names = names.split(',')
+        self.mapping = mapping
+        width, height = size * len(self.names), size * angles
+        self.source = pygame.image.frombuffer(
+            memoryview(mapping)[offset:offset + width * height * 4],
+            (width, height), ATLAS_PIXEL_FORMAT)
+        requested, self.size = self.size, size
+        self.scale()
+        if requested is not None:
+            self.set_size(requested)
+
+
+def main(path):
+    """Сборка файла атласа из изображений папки GRAPHICS_DIR."""
+    pygame.init()
+    assets = AssetManager(angles=(0, 90, 180, 270))
+    assets.save(path)
+    print(f'Атлас {assets.size}x{assets.size}: {", ".join(assets.names)}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,179 @@
+from array import array
+from collections import deque
+
+from snake_engine import DIRECTION_CODES, DIRECTIONS
+
+# Предел номера поколения поиска, после которого отметки сбрасываются
+GENERATION_LIMIT = 0xFFFFFFFF
+
+
+class Autopilot:
+    """Автопилот: ведет змейку к яблоку поиском в ширину по полю.
+
+    Поле замкнуто, как в SnakeModel.move. Занятость ячеек берется из поля
+    змейки, которое движок и так обновляет на каждом ходу, а буферы поиска
+    создаются один раз: посещенные ячейки отмечаются номером поколения,
+    поэтому между поисками ничего не очищается. Найденный путь запоминается
+    и перестраивается, только когда яблоко переместилось или путь
+    перекрыт. Если пути к яблоку нет или, съев яблоко, змейка не сможет
+    добраться до своего хвоста, автопилот идет за хвостом.
+    """
+
+    def __init__(self, snake, apple):
+        self.snake = snake
+        self.apple = apple
+        board = snake.board
+        cells = board.width * board.height
+        # Соседи ячейки в порядке DIRECTIONS: cell * 4 + код направления
+        self.neighbours = array('I', bytes(4 * cells * 4))
+        for cell in range(cells):
+            x, y = board.position(cell)
+            for code, (dx, dy) in enumerate(DIRECTIONS):
+                self.neighbours[cell * 4 + code] = board.index(
+                    ((x + dx) % board.width, (y + dy) % board.height))
+        self.seen = array('I', bytes(4 * cells))
+        self.parent = array('I', bytes(4 * cells))
+        self.queue = array('I', bytes(4 * cells))
+        # Занятость поля после прохода по пути, для проверки безопасности.
+        # Стены уровня заняты всегда
+        self.future = (bytearray(cells) if board.level is None
+                       else bytearray(board.level.walls))
+        self.generation = 0
+        # Запланированный путь к яблоку без ячейки головы
+        self.path = deque()
+        self.target = None
+        self.expected_head = None
+
+    def __call__(self, state=None):
+        """Следующее направление змейки.
+
+        Состояние игры не нужно: автопилот смотрит на змейку и яблоко
+        напрямую, но принимает его, чтобы подходить как агент турнира.
+        """
+        board = self.snake.board
+        head = self.snake.head_cell()
+        target = board.index(self.apple.position)
+        path = self.path
+        if (target == self.target and path and head == self.expected_head
+                and not board.occupied[path[0]]):
+            return self.step_to(head, path.popleft())
+        return self.plan()
+
+    def plan(self):
+        """Полный поиск пути, возвращает направление первого шага."""
+        snake = self.snake
+        board = snake.board
+        head = snake.head_cell()
+        tail = snake.cell(-1)
+        self.target = board.index(self.apple.position)
+        path = self.path
+        path.clear()
+        if self.search(head, self.target, tail, True):
+            self.build_path(head, self.target)
+            if self.path_is_safe():
+                return self.step_to(head, path.popleft())
+            path.clear()
+        if self.search(head, tail, tail, True):
+            self.build_path(head, tail)
+            # За хвостом идем по одному шагу и каждый раз ищем заново
+            self.target = None
+            return self.step_to(head, path.popleft())
+        return self.any_free_step(head)
+
+    def path_is_safe(self):
+        """Проверка, что после пути к яблоку змейка увидит свой хвост."""
+        if self.snake.length < 3:
+            return True
+        tail = self.mark_future(1)
+        safe = self.search(self.target, tail, tail, occupied=self.future)
+        self.mark_future(0)
+        return safe
+
+    def mark_future(self, value):
+        """Отметка тела змейки в момент, когда она съест яблоко.
+
+        Это путь в обратном порядке и начало нынешнего тела, всего на
+        один элемент длиннее. Возвращает ячейку будущего хвоста.
+        """
+        future = self.future
+        left = self.snake.length + 1
+        cell = None
+        for cell in reversed(self.path):
+            future[cell] = value
+            left -= 1
+            if not left:
+                return cell
+        for cell in self.snake.iter_cells():
+            future[cell] = value
+            left -= 1
+            if not left:
+                break
+        return cell
+
+    def search(self, start, goal, tail, from_head=False, occupied=None):
+        """Поиск в ширину от start до goal.
+
+        Проходимы свободные ячейки и ячейка хвоста, который уйдет за ход.
+        Если from_head, из start нельзя шагнуть назад, как и змейке.
+        occupied - занятость ячеек, по умолчанию с поля змейки.
+        """
+        self.generation += 1
+        if self.generation == GENERATION_LIMIT:
+            self.seen = array('I', bytes(len(self.seen) * 4))
+            self.generation = 1
+        generation = self.generation
+        seen, parent, queue = self.seen, self.parent, self.queue
+        neighbours = self.neighbours
+        if occupied is None:
+            occupied = self.snake.board.occupied
+        backward = -1
+        if from_head:
+            backward = start * 4 + (
+                DIRECTION_CODES[self.snake.direction] + 2) % 4
+        seen[start] = generation
+        queue[0] = start
+        first, last = 0, 1
+        while first < last:
+            cell = queue[first]
+            first += 1
+            base = cell * 4
+            for slot in range(base, base + 4):
+                neighbour = neighbours[slot]
+                if (seen[neighbour] == generation or slot == backward
+                        or occupied[neighbour] and neighbour != tail):
+                    continue
+                seen[neighbour] = generation
+                parent[neighbour] = cell
+                if neighbour == goal:
+                    return True
+                queue[last] = neighbour
+                last += 1
+        return False
+
+    def build_path(self, start, goal):
+        """Путь из найденных родителей, от первого шага до goal."""
+        path = self.path
+        path.clear()
+        cell = goal
+        while cell != start:
+            path.appendleft(cell)
+            cell = self.parent[cell]
+
+    def step_to(self, head, cell):
+        """Направление шага из головы в соседнюю ячейку."""
+        self.expected_head = cell
+        base = head * 4
+        for code in range(4):
+            if self.neighbours[base + code] == cell:
+                return DIRECTIONS[code]
+        return None
+
+    def any_free_step(self, head):
+        """Любой шаг в свободную ячейку, когда других вариантов нет."""
+        occupied = self.snake.board.occupied
+        self.path.clear()
+        self.target = None
+        for code in range(4):
+            if not occupied[self.neighbours[head * 4 + code]]:
+                return self.step_to(head, self.neighbours[head * 4 + code])
+        return None
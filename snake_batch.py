@@ -0,0 +1,135 @@
+import numpy as np
+
+from snake_engine import (DIRECTION_CODES, DIRECTIONS, EVENT_APPLE,
+                          EVENT_BOARD_FULL, EVENT_COLLISION, GRID_HEIGHT,
+                          GRID_WIDTH, RIGHT, SPEED_COEFFICIENT, SPEED_START)
+
+# Код, означающий, что игра продолжает движение без поворота
+NO_ACTION = -1
+
+
+class BatchGame:
+    """Пакет из N независимых игр, которые шагают одновременно.
+
+    Все состояния хранятся в массивах NumPy: тело каждой змейки - кольцевой
+    буфер номеров ячеек, занятость поля - матрица (N, ячейки). Правила
+    совпадают с GameEngine: поле замкнуто, разворот назад игнорируется,
+    каждое яблоко увеличивает скорость на SPEED_COEFFICIENT процентов.
+    """
+
+    def __init__(self, count, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 seed=None):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(count)
+        self.delta_x = np.array([dx for dx, _ in DIRECTIONS], np.int64)
+        self.delta_y = np.array([dy for _, dy in DIRECTIONS], np.int64)
+        self.bodies = np.zeros((count, self.cells), np.int64)
+        self.occupied = np.zeros((count, self.cells), np.uint8)
+        self.head_slot = np.zeros(count, np.int64)
+        self.length = np.zeros(count, np.int64)
+        self.direction = np.zeros(count, np.int64)
+        self.apple = np.zeros(count, np.int64)
+        self.score = np.zeros(count, np.int64)
+        self.speed = np.zeros(count, np.float64)
+        self.ticks = np.zeros(count, np.int64)
+        self.done = np.zeros(count, bool)
+        self.reset()
+
+    def reset(self, rows=None):
+        """Начало новой игры в указанных строках пакета (по умолчанию во всех).
+
+        rows - булева маска или массив номеров игр.
+        """
+        rows = self.rows[rows] if rows is not None else self.rows
+        center = (self.height // 2) * self.width + self.width // 2
+        self.occupied[rows] = 0
+        self.occupied[rows, center] = 1
+        self.bodies[rows, 0] = center
+        self.head_slot[rows] = 0
+        self.length[rows] = 1
+        self.direction[rows] = DIRECTION_CODES[RIGHT]
+        self.score[rows] = 0
+        self.speed[rows] = SPEED_START
+        self.ticks[rows] = 0
+        self.done[rows] = False
+        self.place_apples(rows)
+
+    def place_apples(self, rows):
+        """Ставим яблоки в случайные свободные ячейки.
+
+        Возвращает маску игр, в которых свободных ячеек не осталось.
+        """
+        free = self.occupied[rows] == 0
+        free_count = free.sum(axis=1)
+        full = free_count == 0
+        # Номер выбранной свободной ячейки среди свободных в строке
+        choice = (self.rng.random(len(rows)) * free_count).astype(np.int64)
+        cells = (np.cumsum(free, axis=1) > choice[:, None]).argmax(axis=1)
+        self.apple[rows[~full]] = cells[~full]
+        return full
+
+    def heads(self):
+        """Номера ячеек с головами змеек."""
+        return self.bodies[self.rows, self.head_slot]
+
+    def positions(self, game):
+        """Координаты элементов змейки одной игры, начиная с головы."""
+        slots = (self.head_slot[game] - np.arange(self.length[game]))
+        cells = self.bodies[game, slots % self.cells]
+        return [(int(cell) % self.width, int(cell) // self.width)
+                for cell in cells]
+
+    def step(self, actions=None):
+        """Один шаг всех незаконченных игр.
+
+        actions - массив кодов направлений из DIRECTIONS или NO_ACTION.
+        Возвращает словарь событий: имя события -> булева маска игр.
+        """
+        rows = self.rows[~self.done]
+        direction = self.direction[rows]
+        if actions is not None:
+            action = np.asarray(actions)[rows]
+            turn = (action != NO_ACTION) & (action != (direction + 2) % 4)
+            direction = np.where(turn, action, direction)
+            self.direction[rows] = direction
+
+        head_slot = self.head_slot[rows]
+        head = self.bodies[rows, head_slot]
+        new_x = (head % self.width + self.delta_x[direction]) % self.width
+        new_y = (head // self.width + self.delta_y[direction]) % self.height
+        new_head = new_y * self.width + new_x
+        ate = new_head == self.apple[rows]
+
+        # Хвост уходит из ячейки, если змейка не съела яблоко
+        moving = rows[~ate]
+        tail_slot = (self.head_slot[moving] - self.length[moving] + 1)
+        tail = self.bodies[moving, tail_slot % self.cells]
+        self.occupied[moving, tail] -= 1
+
+        collided = ~ate & (self.occupied[rows, new_head] > 0)
+        self.occupied[rows, new_head] += 1
+        head_slot = (head_slot + 1) % self.cells
+        self.head_slot[rows] = head_slot
+        self.bodies[rows, head_slot] = new_head
+        self.ticks[rows] += 1
+
+        eaters = rows[ate]
+        self.length[eaters] += 1
+        self.score[eaters] += 1
+        self.speed[eaters] *= 1 + SPEED_COEFFICIENT / 100
+        full = self.place_apples(eaters)
+
+        events = {
+            EVENT_APPLE: np.zeros(self.count, bool),
+            EVENT_COLLISION: np.zeros(self.count, bool),
+            EVENT_BOARD_FULL: np.zeros(self.count, bool),
+        }
+        events[EVENT_APPLE][eaters] = True
+        events[EVENT_COLLISION][rows] = collided
+        events[EVENT_BOARD_FULL][eaters] = full
+        self.done |= events[EVENT_COLLISION] | events[EVENT_BOARD_FULL]
+        return events
@@ -0,0 +1,183 @@
+import argparse
+import os
+import queue
+import threading
+
+import pygame
+
+# Сколько кадров может ждать записи, прежде чем новые начнут пропускаться
+CAPTURE_BUFFERS = 8
+
+# Сколько прямоугольников пропущенных кадров копится до их объединения
+CAPTURE_MAX_RECTS = 64
+
+# Форматы записи: последовательность PNG в папке или сырые кадры в файле
+CAPTURE_PNG = 'png'
+CAPTURE_RAW = 'raw'
+
+# Имя файла кадра в последовательности PNG, номер - номер кадра игры
+CAPTURE_FRAME_NAME = 'frame_{:06d}.png'
+
+# Маски цветов буферов: байты пикселя в памяти идут как B, G, R, 0, это
+# формат bgr0 для ffmpeg -f rawvideo -pix_fmt bgr0
+CAPTURE_MASKS = (0xFF0000, 0xFF00, 0xFF, 0)
+CAPTURE_RAW_PIXEL_FORMAT = 'bgr0'
+
+
+class FrameCapture:
+    """Запись кадров игры в фоновом потоке.
+
+    Кадр не копируется целиком: в один из заранее созданных буферов
+    переносятся только измененные прямоугольники экрана, а фоновый поток
+    накладывает их на свой холст и сохраняет его. Если все буферы заняты,
+    кадр пропускается, а его прямоугольники переходят к следующему кадру,
+    поэтому игра не ждет записи, а холст остается верным.
+    """
+
+    def __init__(self, size, output, file_format=CAPTURE_PNG,
+                 buffers=CAPTURE_BUFFERS):
+        self.output = output
+        self.format = file_format
+        self.rect = pygame.Rect((0, 0), size)
+        self.buffers = [self.make_surface() for _ in range(buffers)]
+        # Прямоугольники, перенесенные в каждый буфер
+        self.buffer_rects = [[] for _ in range(buffers)]
+        self.canvas = self.make_surface()
+        # Свободные буферы и буферы с кадрами, которые ждут записи
+        self.free = queue.SimpleQueue()
+        for number in range(buffers):
+            self.free.put(number)
+        self.ready = queue.SimpleQueue()
+        # Прямоугольники пропущенных кадров, первый кадр копируется целиком
+        self.pending = [self.rect]
+        self.frames = 0
+        self.saved = 0
+        self.dropped = 0
+        self.file = None
+        self.thread = None
+
+    def make_surface(self):
+        """Поверхность размером с кадр в формате CAPTURE_MASKS."""
+        return pygame.Surface(self.rect.size, 0, 32, CAPTURE_MASKS)
+
+    def start(self):
+        """Запуск фонового потока записи."""
+        if self.format == CAPTURE_PNG:
+            os.makedirs(self.output, exist_ok=True)
+        else:
+            self.file = open(self.output, 'wb')
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+        return self
+
+    def add(self, surface, rects=None, wait=False):
+        """Кадр с поверхности surface.
+
+        rects - измененные с прошлого кадра прямоугольники, None - весь
+        кадр. Если свободных буферов нет, кадр пропускается, а при wait
+        ожидается освобождение буфера. Возвращает True, если кадр
+        отправлен на запись.
+        """
+        self.frames += 1
+        rects = [self.rect] if rects is None else rects
+        if wait:
+            number = self.free.get()
+        else:
+            try:
+                number = self.free.get_nowait()
+            except queue.Empty:
+                self.drop(rects)
+                return False
+        buffer = self.buffers[number]
+        copied = self.buffer_rects[number]
+        copied.clear()
+        for rect in self.pending + rects:
+            rect = self.rect.clip(rect)
+            if rect:
+                buffer.blit(surface, rect, rect)
+                copied.append(rect)
+        self.pending = []
+        self.ready.put((number, self.frames))
+        return True
+
+    def drop(self, rects):
+        """Пропуск кадра: его прямоугольники копируются со следующим."""
+        self.dropped += 1
+        self.pending.extend(rects)
+        if len(self.pending) > CAPTURE_MAX_RECTS:
+            self.pending = [pygame.Rect(self.pending[0]).unionall(
+                self.pending[1:])]
+
+    def work(self):
+        """Фоновый поток: перенос буферов на холст и запись кадров."""
+        while True:
+            item = self.ready.get()
+            if item is None:
+                break
+            number, frame = item
+            buffer = self.buffers[number]
+            for rect in self.buffer_rects[number]:
+                self.canvas.blit(buffer, rect, rect)
+            # Буфер уже перенесен, пока кадр пишется, он нужен игре
+            self.free.put(number)
+            self.write(frame)
+            self.saved += 1
+
+    def write(self, frame):
+        """Запись холста в файл PNG или в поток сырых кадров."""
+        if self.format == CAPTURE_PNG:
+            pygame.image.save(self.canvas, os.path.join(
+                self.output, CAPTURE_FRAME_NAME.format(frame)))
+        else:
+            self.file.write(self.canvas.get_buffer())
+
+    def close(self):
+        """Запись оставшихся кадров и остановка потока."""
+        if self.thread is not None:
+            self.ready.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def main():
+    """Отрисовка записанных игр в кадры без окна."""
+    parser = argparse.ArgumentParser(
+        description='Запись игр Змейки в кадры PNG или сырое видео.')
+    parser.add_argument('replays', help='файл записей игр')
+    parser.add_argument('output', help='папка для кадров или файлов видео')
+    parser.add_argument('--format', choices=(CAPTURE_PNG, CAPTURE_RAW),
+                        default=CAPTURE_PNG)
+    parser.add_argument('--games', default=None,
+                        help='номера игр через запятую, по умолчанию все')
+    args = parser.parse_args()
+    # Окно не открывается: игра рисуется в память, нужны только шрифты
+    import the_snake
+    from snake_replay import ReplayFile
+
+    pygame.font.init()
+    with ReplayFile(args.replays) as replays:
+        numbers = (range(len(replays)) if args.games is None
+                   else [int(number) for number in args.games.split(',')])
+        for number in numbers:
+            output = os.path.join(args.output, f'game_{number:04d}')
+            if args.format == CAPTURE_RAW:
+                os.makedirs(args.output, exist_ok=True)
+                output += '.raw'
+            capture = FrameCapture(the_snake.screen.get_size(), output,
+                                   args.format).start()
+            try:
+                the_snake.render_replay(replays[number], capture)
+            finally:
+                capture.close()
+            width, height = capture.rect.size
+            pixel_format = (f', {CAPTURE_RAW_PIXEL_FORMAT}'
+                            if args.format == CAPTURE_RAW else '')
+            print(f'{number}: {capture.saved} кадров {width}x{height}'
+                  f'{pixel_format} в {output}')
+
+
+if __name__ == '__main__':
+    main()
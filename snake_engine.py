@@ -0,0 +1,656 @@
+import struct
+from array import array
+from collections import namedtuple
+from random import Random, getrandbits
+
+# Размеры поля в ячейках:
+GRID_WIDTH, GRID_HEIGHT = 32, 24
+GRID_CENTER = (GRID_WIDTH // 2, GRID_HEIGHT // 2)
+
+# Направления движения:
+UP = (0, -1,)
+LEFT = (-1, 0)
+DOWN = (0, 1,)
+RIGHT = (1, 0)
+
+# Коды направлений для компактного хранения: противоположное направление
+# всегда отличается на 2 по модулю 4
+DIRECTIONS = (UP, LEFT, DOWN, RIGHT)
+DIRECTION_CODES = {
+    direction: code for code, direction in enumerate(DIRECTIONS)
+}
+
+# Начальный размер кольцевого буфера тела змейки, он удваивается по мере
+# роста змейки
+SNAKE_CAPACITY = 16
+
+# Скорость движения змейки:
+SPEED_START = 10
+
+# Коэффициент прибавки скорости за каждое яблоко (+3%)
+SPEED_COEFFICIENT = 1
+
+# События, которые возвращает GameEngine.step
+EVENT_APPLE = 'apple'
+EVENT_COLLISION = 'collision'
+EVENT_BOARD_FULL = 'board_full'
+
+# Заголовок снимка состояния игры: направление, следующее направление,
+# ячейка ушедшего хвоста, длина змейки, ячейка яблока, скорость, счёт,
+# тики и конец игры
+SNAPSHOT_HEADER = struct.Struct('<BBiIIdII?')
+
+# Код направления и ячейка в снимке, когда значения нет
+NO_DIRECTION = 0xFF
+NO_CELL = -1
+
+# Место в наборе свободных ячеек в журнале поля, когда набор не менялся
+NO_SLOT = 0xFFFFFFFF
+
+# Состояние игры после очередного шага
+GameState = namedtuple(
+    'GameState',
+    'head last apple direction length score speed ticks game_over'
+)
+
+# Снимок игры для GameEngine.restore: байты моделей, состояние генератора
+# яблок и отметка в журнале поля. Состояние генератора - неизменяемый
+# кортеж, поэтому его можно не копировать, а делить между снимками
+GameSnapshot = namedtuple('GameSnapshot', 'data rng_state mark')
+
+
+class FreeCells:
+    """Набор свободных ячеек поля.
+
+    Номера свободных ячеек лежат в начале массива cells, а slots хранит
+    место каждой ячейки в этом массиве. Добавление, удаление и выбор
+    случайной свободной ячейки выполняются за O(1). Места, которые
+    менялись, запоминаются, и reset возвращает исходный порядок только
+    в них.
+    """
+
+    __slots__ = ('cells', 'slots', 'count', 'base', 'moved', 'touched')
+
+    def __init__(self, size=GRID_WIDTH * GRID_HEIGHT, level=None):
+        if level is None:
+            self.cells = array('I', range(size))
+            self.slots = array('I', range(size))
+            # Исходный порядок: ячейка на своем месте, None - по номеру
+            self.base = None
+        else:
+            # Стены уровня в набор не входят никогда
+            self.cells = array('I')
+            self.cells.frombytes(level.free)
+            self.slots = array('I')
+            self.slots.frombytes(level.slots)
+            self.base = memoryview(level.free).cast('I')
+        self.count = len(self.cells)
+        # Отметки мест, которые менялись с прошлого reset, и их список
+        self.moved = bytearray(self.count)
+        self.touched = array('I')
+
+    def __len__(self):
+        """Количество свободных ячеек."""
+        return self.count
+
+    def swap(self, cell, slot):
+        """Перестановка ячейки на указанное место в массиве."""
+        cells, slots, changed = self.cells, self.slots, self.moved
+        old_slot = slots[cell]
+        moved = cells[slot]
+        cells[old_slot] = moved
+        slots[moved] = old_slot
+        cells[slot] = cell
+        slots[cell] = slot
+        if not changed[old_slot]:
+            changed[old_slot] = 1
+            self.touched.append(old_slot)
+        if not changed[slot]:
+            changed[slot] = 1
+            self.touched.append(slot)
+
+    def reset(self):
+        """Возврат исходного порядка: все ячейки снова свободны.
+
+        Обходятся только места, которые менялись с прошлого reset.
+        Возвращает ячейки, которые возвращены на свои места, - среди них
+        все ячейки, которые были заняты.
+        """
+        cells, slots, base = self.cells, self.slots, self.base
+        restored = []
+        for slot in self.touched:
+            cell = slot if base is None else base[slot]
+            cells[slot] = cell
+            slots[cell] = slot
+            self.moved[slot] = 0
+            restored.append(cell)
+        del self.touched[:]
+        self.count = len(cells)
+        return restored
+
+    def remove(self, cell):
+        """Ячейка стала занятой."""
+        self.count -= 1
+        self.swap(cell, self.count)
+
+    def add(self, cell):
+        """Ячейка освободилась."""
+        self.swap(cell, self.count)
+        self.count += 1
+
+    def choice(self, rng):
+        """Случайная свободная ячейка."""
+        return self.cells[rng.randrange(self.count)]
+
+
+class Board:
+    """Игровое поле: занятость ячеек и набор свободных ячеек.
+
+    На поле может быть уровень со стенами (snake_levels.Level): стена
+    занимает ячейку так же, как элемент змейки, поэтому столкновение со
+    стеной - та же проверка занятости, а яблоки в стены не попадают.
+    """
+
+    __slots__ = ('width', 'height', 'center', 'cell_type', 'level',
+                 'occupied', 'free_cells', 'journal', 'marks')
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, level=None):
+        if level is not None and (level.width, level.height) != (width,
+                                                                 height):
+            raise ValueError('Размер уровня не совпадает с размером поля.')
+        self.width = width
+        self.height = height
+        self.level = level
+        # Клетка, с которой змейка начинает игру
+        self.center = ((width // 2, height // 2) if level is None
+                       else level.start)
+        # Тип элементов массивов с номерами ячеек: 2 байта, если хватает
+        self.cell_type = 'H' if width * height <= 1 << 16 else 'I'
+        # Сколько элементов змеек (и стен) находится в каждой ячейке поля
+        self.occupied = (bytearray(width * height) if level is None
+                         else bytearray(level.walls))
+        # Ячейки, куда можно поставить яблоко
+        self.free_cells = FreeCells(width * height, level)
+        self.forget()
+
+    def clear(self):
+        """Освобождение всех ячеек поля, кроме стен уровня.
+
+        Поле не строится заново: освобождаются только ячейки, которые
+        занимались с прошлой очистки, поэтому новая игра на огромном поле
+        стоит столько, сколько ячеек прошла змейка. Порядок свободных
+        ячеек при этом всегда исходный, иначе яблоки зависели бы от
+        предыдущих игр. Элементы змеек в стенах нужно убрать заранее.
+        """
+        occupied = self.occupied
+        for cell in self.free_cells.reset():
+            occupied[cell] = 0
+        self.forget()
+
+    def forget(self):
+        """Отказ от всех отметок: журнал изменений больше не ведется."""
+        # Журнал изменений поля для undo: пары (ячейка * 2 + 1, если она
+        # освобождена, и её прежнее место в наборе свободных ячеек или
+        # NO_SLOT). Ведется только после первой отметки
+        self.journal = None
+        # Отметки в журнале от старых к новым: (метка, длина журнала)
+        self.marks = []
+
+    def mark(self):
+        """Отметка текущего состояния поля для undo."""
+        if self.journal is None:
+            self.journal = array('I')
+        token = object()
+        self.marks.append((token, len(self.journal)))
+        return token
+
+    def undo(self, token):
+        """Возврат занятости и набора свободных ячеек к отметке token.
+
+        Отменяются только изменения после отметки. Отметки, сделанные
+        после неё, становятся недействительными.
+        """
+        marks = self.marks
+        for number in range(len(marks) - 1, -1, -1):
+            if marks[number][0] is token:
+                break
+        else:
+            raise ValueError('Отметка сделана на другом поле, в другой '
+                             'ветке игры или до очистки поля.')
+        position = marks[number][1]
+        del marks[number + 1:]
+        journal = self.journal
+        occupied = self.occupied
+        free_cells = self.free_cells
+        while len(journal) > position:
+            old_slot = journal.pop()
+            entry = journal.pop()
+            cell = entry >> 1
+            if entry & 1:
+                if old_slot != NO_SLOT:
+                    free_cells.count -= 1
+                    free_cells.swap(cell, old_slot)
+                occupied[cell] += 1
+            else:
+                occupied[cell] -= 1
+                if old_slot != NO_SLOT:
+                    free_cells.swap(cell, old_slot)
+                    free_cells.count += 1
+
+    def index(self, position):
+        """Номер ячейки по её координатам."""
+        return position[1] * self.width + position[0]
+
+    def position(self, cell):
+        """Координаты ячейки по её номеру."""
+        return cell % self.width, cell // self.width
+
+    def occupy(self, cell):
+        """Элемент змейки занял ячейку."""
+        journal = self.journal
+        if not self.occupied[cell]:
+            if journal is not None:
+                journal.extend((cell << 1, self.free_cells.slots[cell]))
+            self.free_cells.remove(cell)
+        elif journal is not None:
+            journal.extend((cell << 1, NO_SLOT))
+        self.occupied[cell] += 1
+
+    def release(self, cell):
+        """Элемент змейки покинул ячейку."""
+        journal = self.journal
+        self.occupied[cell] -= 1
+        if not self.occupied[cell]:
+            if journal is not None:
+                journal.extend((cell << 1 | 1, self.free_cells.slots[cell]))
+            self.free_cells.add(cell)
+        elif journal is not None:
+            journal.extend((cell << 1 | 1, NO_SLOT))
+
+    def step_code(self, cell, next_cell):
+        """Код направления шага между соседними ячейками замкнутого поля."""
+        if (next_cell - cell) % self.width == 1:
+            return DIRECTION_CODES[RIGHT]
+        if (cell - next_cell) % self.width == 1:
+            return DIRECTION_CODES[LEFT]
+        if next_cell // self.width == (cell // self.width + 1) % self.height:
+            return DIRECTION_CODES[DOWN]
+        return DIRECTION_CODES[UP]
+
+    def is_occupied(self, position):
+        """Проверка, занята ли ячейка."""
+        return self.occupied[self.index(position)] > 0
+
+
+class SnakeBody:
+    """Координаты элементов змейки от головы к хвосту.
+
+    Не хранит координаты, а вычисляет их из номеров ячеек при обращении.
+    """
+
+    __slots__ = ('snake',)
+
+    def __init__(self, snake):
+        self.snake = snake
+
+    def __len__(self):
+        """Длина змейки."""
+        return self.snake.length
+
+    def __getitem__(self, index):
+        """Координаты элемента змейки, 0 - голова, -1 - хвост."""
+        return self.snake.board.position(self.snake.cell(index))
+
+    def __iter__(self):
+        """Координаты элементов от головы к хвосту."""
+        position = self.snake.board.position
+        for cell in self.snake.iter_cells():
+            yield position(cell)
+
+
+class SnakeModel:
+    """Логика Змейки без отрисовки.
+
+    Тело змейки - кольцевой буфер номеров ячеек (y * ширина + x): голова
+    лежит в head_slot, остальные элементы перед ней. Координаты ячеек
+    вычисляются только по запросу, например для отрисовки. Параллельный
+    буфер codes хранит для каждого элемента код направления, которым
+    змейка вошла в его ячейку, - по нему элемент рисуется без вычислений
+    по координатам, в том числе после прохода через край поля.
+    """
+
+    __slots__ = ('board', 'cells', 'codes', 'head_slot', 'length',
+                 'direction', 'next_direction', 'last_cell', 'speed')
+
+    def __init__(self, board=None, start=None):
+        self.board = Board() if board is None else board
+        self.load_cells([])
+        self.reset(start)
+
+    @property
+    def positions(self):
+        """Координаты элементов змейки от головы к хвосту."""
+        return SnakeBody(self)
+
+    @positions.setter
+    def positions(self, positions):
+        """Новое тело змейки из координат, начиная с головы.
+
+        Занятость поля не меняется.
+        """
+        index = self.board.index
+        self.load_cells([index(position) for position in positions])
+
+    @property
+    def last(self):
+        """Координаты ячейки, которую хвост освободил на последнем ходу."""
+        if self.last_cell is None:
+            return None
+        return self.board.position(self.last_cell)
+
+    def load_cells(self, cells):
+        """Новое тело из номеров ячеек, начиная с головы.
+
+        Направления, которыми элементы вошли в свои ячейки, вычисляются
+        по соседним ячейкам.
+        """
+        step_code = self.board.step_code
+        codes = bytearray(
+            step_code(cell, next_cell)
+            for cell, next_cell in zip(cells[1:], cells)
+        )
+        # У хвоста нет предыдущего элемента, он продолжает следующий
+        if cells:
+            codes.append(codes[-1] if codes else DIRECTION_CODES[RIGHT])
+        self.load_ordered(array(self.board.cell_type, reversed(cells)),
+                          codes[::-1])
+
+    def load_ordered(self, cells, codes):
+        """Новое тело из ячеек и кодов направлений от хвоста к голове."""
+        self.length = len(cells)
+        self.head_slot = max(0, self.length - 1)
+        # Запас в буфере, чтобы змейка могла расти без переноса тела
+        spare = max(SNAKE_CAPACITY, 2 * self.length) - self.length
+        self.cells = cells + array(self.board.cell_type, (0,)) * spare
+        # Буфер кодов всегда той же длины, что и буфер ячеек
+        self.codes = codes[:self.length] + bytes(spare)
+
+    def unwrap(self, buffer):
+        """Элементы кольцевого буфера тела подряд от хвоста к голове."""
+        start = (self.head_slot - self.length + 1) % len(buffer)
+        if start + self.length <= len(buffer):
+            return buffer[start:start + self.length]
+        return buffer[start:] + buffer[:self.head_slot + 1]
+
+    def body_bytes(self):
+        """Ячейки и коды направлений тела одним блоком байт."""
+        return self.unwrap(self.cells).tobytes() + self.unwrap(self.codes)
+
+    def load_body(self, data):
+        """Новое тело из блока байт body_bytes.
+
+        Занятость поля не меняется.
+        """
+        cells = array(self.board.cell_type)
+        size = len(data) // (cells.itemsize + 1) * cells.itemsize
+        cells.frombytes(data[:size])
+        self.load_ordered(cells, bytearray(data[size:]))
+
+    def reset(self, start=None):
+        """Сброс Змейки.
+
+        start - клетка, с которой змейка начинает, по умолчанию центр поля.
+        """
+        board = self.board
+        self.remove()
+        start = board.center if start is None else start
+        cell = board.index(start)
+        self.cells[0] = cell
+        self.codes[0] = DIRECTION_CODES[RIGHT]
+        self.head_slot = 0
+        self.length = 1
+        board.occupy(cell)
+        self.direction = RIGHT
+        self.next_direction = None
+        self.last_cell = None
+        self.speed = SPEED_START
+
+    def remove(self):
+        """Убираем змейку с поля, освобождая занятые ей ячейки."""
+        occupied = self.board.occupied
+        for cell in self.iter_cells():
+            # Ячейка могла быть уже освобождена очисткой всего поля
+            if occupied[cell]:
+                self.board.release(cell)
+        self.length = 0
+
+    def cell(self, index):
+        """Номер ячейки элемента змейки, 0 - голова, -1 - хвост."""
+        length = self.length
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('Нет такого элемента змейки.')
+        return self.cells[(self.head_slot - index) % len(self.cells)]
+
+    def code(self, index):
+        """Код направления, которым элемент змейки вошел в свою ячейку."""
+        length = self.length
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('Нет такого элемента змейки.')
+        return self.codes[(self.head_slot - index) % len(self.codes)]
+
+    def head_cell(self):
+        """Номер ячейки головы."""
+        return self.cells[self.head_slot]
+
+    def iter_cells(self):
+        """Номера ячеек элементов от головы к хвосту."""
+        cells = self.cells
+        capacity = len(cells)
+        slot = self.head_slot
+        for _ in range(self.length):
+            yield cells[slot]
+            slot = (slot - 1) % capacity
+
+    def get_head_position(self):
+        """Получение координат головы змейки."""
+        return self.board.position(self.cells[self.head_slot])
+
+    def turn(self, direction):
+        """Запоминаем поворот, если он не разворачивает змейку назад."""
+        if direction != (-self.direction[0], -self.direction[1]):
+            self.next_direction = direction
+
+    def update_direction(self):
+        """Обновление направления."""
+        if self.next_direction:
+            self.direction = self.next_direction
+            self.next_direction = None
+
+    def move(self):
+        """Двигаем змейку на следующую клетку."""
+        board = self.board
+        width = board.width
+        cells = self.cells
+        capacity = len(cells)
+        head = cells[self.head_slot]
+        new_head = ((head // width + self.direction[1]) % board.height
+                    * width + (head % width + self.direction[0]) % width)
+        self.head_slot = (self.head_slot + 1) % capacity
+        cells[self.head_slot] = new_head
+        self.codes[self.head_slot] = DIRECTION_CODES[self.direction]
+        board.occupy(new_head)
+        self.last_cell = cells[(self.head_slot - self.length) % capacity]
+        board.release(self.last_cell)
+
+    def grow(self):
+        """Возвращаем змейке последний удаленный элемент хвоста."""
+        # Ячейка хвоста еще лежит в буфере сразу за телом
+        self.length += 1
+        self.board.occupy(self.last_cell)
+        # Хвост снова на месте, затирать его не нужно
+        self.last_cell = None
+        if self.length == len(self.cells):
+            self.expand()
+
+    def expand(self):
+        """Удвоение буфера тела, чтобы следующий ход не затер хвост."""
+        self.load_ordered(self.unwrap(self.cells), self.unwrap(self.codes))
+
+    def occupies(self, position):
+        """Проверка, занята ли ячейка змейкой."""
+        return self.board.is_occupied(position)
+
+    def check_collision(self):
+        """Проверка, врезалась ли голова змейки в своё тело."""
+        return self.board.occupied[self.cells[self.head_slot]] > 1
+
+
+class AppleModel:
+    """Логика Яблока без отрисовки."""
+
+    __slots__ = ('width', 'height', 'rng', 'position')
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, rng=None):
+        self.width = width
+        self.height = height
+        # Генератор случайных чисел, от которого зависят только яблоки
+        self.rng = Random() if rng is None else rng
+        self.randomize_position()
+
+    def randomize_position(self, free_cells=None):
+        """Генерация рандомной позиции для Яблока.
+
+        Если передан набор свободных ячеек, яблоко ставится только в одну
+        из них. Возвращает False, когда свободных ячеек не осталось.
+        """
+        if free_cells is None:
+            self.position = (self.rng.randrange(self.width),
+                             self.rng.randrange(self.height))
+            return True
+        if not free_cells:
+            return False
+        cell = free_cells.choice(self.rng)
+        self.position = cell % self.width, cell // self.width
+        return True
+
+
+class GameEngine:
+    """Правила игры: шаг змейки, яблоки, счёт и конец игры."""
+
+    __slots__ = ('snake', 'apple', 'seed', 'score', 'ticks', 'game_over')
+
+    def __init__(self, snake=None, apple=None, seed=None):
+        self.snake = SnakeModel() if snake is None else snake
+        board = self.snake.board
+        self.apple = (AppleModel(board.width, board.height)
+                      if apple is None else apple)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Начало новой игры.
+
+        seed - зерно генератора яблок. Если оно не задано, выбирается
+        случайное и сохраняется в self.seed, чтобы игру можно было повторить.
+        """
+        self.seed = getrandbits(64) if seed is None else seed
+        self.apple.rng.seed(self.seed)
+        # Поле всегда начинается с одного и того же порядка свободных
+        # ячеек, иначе яблоки зависели бы от предыдущих игр. Змейка
+        # убирается до очистки: очистка не трогает стены, а голова могла
+        # остаться в стене, в которую змейка врезалась
+        self.snake.remove()
+        self.snake.board.clear()
+        self.snake.reset()
+        self.apple.randomize_position(self.snake.board.free_cells)
+        self.score = 0
+        self.ticks = 0
+        self.game_over = False
+
+    def snapshot(self):
+        """Снимок состояния игры для restore.
+
+        В снимок входят только модели: тело змейки, направления, скорость,
+        счёт, яблоко и состояние его генератора. Поле не копируется: после
+        первого снимка оно ведет журнал изменений, и restore отменяет их,
+        поэтому снимок стоит O(длины змейки), а возврат - O(числа ходов
+        после снимка) при любом размере поля.
+        """
+        snake = self.snake
+        header = SNAPSHOT_HEADER.pack(
+            DIRECTION_CODES[snake.direction],
+            DIRECTION_CODES.get(snake.next_direction, NO_DIRECTION),
+            NO_CELL if snake.last_cell is None else snake.last_cell,
+            snake.length, snake.board.index(self.apple.position),
+            snake.speed, self.score, self.ticks, self.game_over)
+        return GameSnapshot(header + snake.body_bytes(),
+                            self.apple.rng.getstate(), snake.board.mark())
+
+    def restore(self, snapshot):
+        """Возврат к состоянию игры из snapshot.
+
+        Вернуться можно к любому снимку этой игры, сделанному после
+        reset и не отмененному возвратом к более раннему снимку, иначе
+        ValueError. Отрисовку змейки и яблока после возврата нужно
+        обновить отдельно.
+        """
+        snake = self.snake
+        board = snake.board
+        board.undo(snapshot.mark)
+        (direction, next_direction, last_cell, length, apple, speed,
+         self.score, self.ticks,
+         self.game_over) = SNAPSHOT_HEADER.unpack_from(snapshot.data)
+        snake.load_body(memoryview(snapshot.data)[SNAPSHOT_HEADER.size:])
+        self.apple.rng.setstate(snapshot.rng_state)
+        snake.direction = DIRECTIONS[direction]
+        snake.next_direction = (None if next_direction == NO_DIRECTION
+                                else DIRECTIONS[next_direction])
+        snake.last_cell = None if last_cell == NO_CELL else last_cell
+        snake.speed = speed
+        self.apple.position = board.position(apple)
+
+    def forget_snapshots(self):
+        """Отказ от всех снимков, например после выбора хода поиском.
+
+        Журнал поля больше не растет до следующего снимка.
+        """
+        self.snake.board.forget()
+
+    def state(self):
+        """Текущее состояние игры."""
+        snake = self.snake
+        return GameState(snake.get_head_position(), snake.last,
+                         self.apple.position, snake.direction, snake.length,
+                         self.score, snake.speed, self.ticks, self.game_over)
+
+    def step(self, action=None):
+        """Один шаг игры.
+
+        action - новое направление движения или None. Возвращает
+        состояние игры и кортеж произошедших событий.
+        """
+        snake = self.snake
+        if action is not None:
+            snake.turn(action)
+        snake.update_direction()
+        snake.move()
+        self.ticks += 1
+        if snake.head_cell() == snake.board.index(self.apple.position):
+            snake.grow()
+            snake.speed *= 1 + SPEED_COEFFICIENT / 100
+            self.score += 1
+            if self.apple.randomize_position(snake.board.free_cells):
+                events = (EVENT_APPLE,)
+            else:
+                # Змейка заняла всё поле
+                self.game_over = True
+                events = (EVENT_APPLE, EVENT_BOARD_FULL)
+        elif snake.check_collision():
+            self.game_over = True
+            events = (EVENT_COLLISION,)
+        else:
+            events = ()
+        return self.state(), events
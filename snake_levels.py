@@ -0,0 +1,109 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# Заголовок файла уровня: метка, версия, ширина и высота поля, клетка
+# старта змейки и число свободных от стен ячеек
+LEVEL_MAGIC = b'SNKL'
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct('<4sBIIIII')
+
+# Символы текстовой карты уровня
+LEVEL_WALL = '#'
+LEVEL_START = 'S'
+
+
+class Level:
+    """Уровень: стены на замкнутом поле.
+
+    В файле после заголовка лежат карта стен (байт на ячейку, 1 - стена),
+    свободные ячейки и место каждой из них в этом списке - в том же виде,
+    что и в FreeCells. Файл отображается в память, поэтому уровень
+    загружается сразу при любом размере, а Board.clear только копирует
+    эти массивы.
+    """
+
+    def __init__(self, width, height, walls, start=None, free=None,
+                 slots=None):
+        self.width = width
+        self.height = height
+        # Карта стен: байт на ячейку, 1 - стена
+        self.walls = walls
+        if free is None:
+            free_cells = array('I', (cell for cell in range(width * height)
+                                     if not walls[cell]))
+            free_slots = array('I', bytes(4 * width * height))
+            for slot, cell in enumerate(free_cells):
+                free_slots[cell] = slot
+            free, slots = free_cells.tobytes(), free_slots.tobytes()
+        # Свободные ячейки и их места, байты массивов типа 'I'
+        self.free = free
+        self.slots = slots
+        self.start = (width // 2, height // 2) if start is None else start
+        # Отображение файла в память, пока уровень из него используется
+        self.mapping = None
+
+    @classmethod
+    def from_text(cls, text):
+        """Уровень из текстовой карты: # - стена, S - старт змейки."""
+        lines = text.splitlines()
+        width = max(len(line) for line in lines)
+        walls = bytearray(width * len(lines))
+        start = None
+        for y, line in enumerate(lines):
+            for x, symbol in enumerate(line):
+                if symbol == LEVEL_WALL:
+                    walls[y * width + x] = 1
+                elif symbol == LEVEL_START:
+                    start = (x, y)
+        return cls(width, len(lines), walls, start)
+
+    @classmethod
+    def load(cls, path):
+        """Загрузка уровня из файла без чтения его в память."""
+        with open(path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, start_x, start_y, free = (
+            LEVEL_HEADER.unpack_from(mapping))
+        if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+            mapping.close()
+            raise ValueError(f'Файл {path} не содержит уровень.')
+        data = memoryview(mapping)
+        offset = LEVEL_HEADER.size
+        size = width * height
+        level = cls(width, height, data[offset:offset + size],
+                    (start_x, start_y),
+                    data[offset + size:offset + size + 4 * free],
+                    data[offset + size + 4 * free:offset + 5 * size
+                         + 4 * free])
+        level.mapping = mapping
+        return level
+
+    def save(self, path):
+        """Сохранение уровня в файл."""
+        with open(path, 'wb') as file:
+            file.write(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION,
+                                         self.width, self.height,
+                                         *self.start, len(self.free) // 4))
+            file.write(self.walls)
+            file.write(self.free)
+            file.write(self.slots)
+
+    def is_wall(self, cell):
+        """Проверка, стоит ли в ячейке стена."""
+        return self.walls[cell] == 1
+
+
+def main(source, path):
+    """Сборка файла уровня из текстовой карты."""
+    with open(source, encoding='utf-8') as file:
+        level = Level.from_text(file.read())
+    level.save(path)
+    walls = level.width * level.height - len(level.free) // 4
+    print(f'Уровень {level.width}x{level.height}: стен {walls}, '
+          f'старт {level.start}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,166 @@
+import csv
+import json
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+# Сколько последних кадров хранится для перцентилей
+PROFILER_WINDOW = 600
+
+# Перцентили, которые считаются по окну кадров
+PROFILER_PERCENTILES = (50, 95, 99)
+
+# Счётчики памяти, которые пишутся для каждого кадра вместе с фазами:
+# прирост числа блоков памяти и пик выделенной за кадр памяти в байтах
+MEMORY_BLOCKS = 'alloc_blocks'
+MEMORY_PEAK = 'alloc_peak'
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0
+    rank = min(len(values) - 1, len(values) * percent // 100)
+    return values[rank]
+
+
+class FrameProfiler:
+    """Замер времени фаз кадра.
+
+    Время фаз в наносекундах суммируется за кадр и складывается в окно
+    последних PROFILER_WINDOW кадров. Методы объектов оборачиваются
+    только пока профилировщик включен, а после выключения обертки
+    снимаются, поэтому выключенный профилировщик ничего не стоит.
+    """
+
+    def __init__(self, window=PROFILER_WINDOW):
+        self.enabled = False
+        self.phases = []
+        self.history = {}
+        self.frame = {}
+        self.frames = 0
+        self.window = window
+        # Обернутые методы: (объект, имя метода)
+        self.patched = []
+        self.blocks = 0
+
+    def add_phase(self, phase):
+        """Регистрируем фазу, чтобы она попала в отчёт."""
+        if phase not in self.history:
+            self.phases.append(phase)
+            self.history[phase] = deque(maxlen=self.window)
+
+    def enable(self, phases=(), methods=()):
+        """Включение замеров.
+
+        phases - фазы, время которых замеряется через timed. methods -
+        тройки (объект, имя метода, фаза): вызовы этих методов будут
+        засчитываться в указанную фазу.
+        """
+        for phase in phases:
+            self.add_phase(phase)
+        for obj, name, phase in methods:
+            self.instrument(obj, name, phase)
+        for phase in (MEMORY_BLOCKS, MEMORY_PEAK):
+            self.add_phase(phase)
+        tracemalloc.start()
+        self.enabled = True
+        self.start_frame()
+
+    def disable(self):
+        """Выключение замеров и снятие всех оберток."""
+        for obj, name in self.patched:
+            delattr(obj, name)
+        self.patched.clear()
+        tracemalloc.stop()
+        self.enabled = False
+
+    def instrument(self, obj, name, phase):
+        """Оборачиваем метод объекта, чтобы засчитывать его время в фазу."""
+        self.add_phase(phase)
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter_ns() - start)
+
+        setattr(obj, name, timed)
+        self.patched.append((obj, name))
+
+    def timed(self, phase, func, *args):
+        """Вызов функции с засчитыванием её времени в фазу."""
+        start = time.perf_counter_ns()
+        result = func(*args)
+        self.add(phase, time.perf_counter_ns() - start)
+        return result
+
+    def add(self, phase, value):
+        """Добавляем время к фазе текущего кадра."""
+        self.frame[phase] = self.frame.get(phase, 0) + value
+
+    def start_frame(self):
+        """Начало кадра."""
+        self.frame = {}
+        self.blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        self.frame_memory = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        """Конец кадра: время фаз уходит в окно последних кадров."""
+        frame = self.frame
+        frame[MEMORY_BLOCKS] = sys.getallocatedblocks() - self.blocks
+        frame[MEMORY_PEAK] = (tracemalloc.get_traced_memory()[1]
+                              - self.frame_memory)
+        for phase in self.phases:
+            self.history[phase].append(frame.get(phase, 0))
+        self.frames += 1
+        self.start_frame()
+
+    def summary(self):
+        """Перцентили каждой фазы по окну последних кадров."""
+        result = {}
+        for phase in self.phases:
+            values = sorted(self.history[phase])
+            result[phase] = {
+                f'p{percent}': percentile(values, percent)
+                for percent in PROFILER_PERCENTILES
+            }
+        return result
+
+    def histogram(self, phase):
+        """Гистограмма фазы: число кадров в интервалах по степеням двойки.
+
+        Ключ - верхняя граница интервала, для времени в наносекундах.
+        """
+        counts = {}
+        for value in self.history[phase]:
+            bound = 1 << max(0, int(value)).bit_length()
+            counts[bound] = counts.get(bound, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def export_json(self, path):
+        """Сохранение перцентилей и гистограмм в JSON."""
+        report = {
+            'unit': 'ns',
+            'frames': self.frames,
+            'window': len(next(iter(self.history.values()), ())),
+            'summary': self.summary(),
+            'histograms': {phase: self.histogram(phase)
+                           for phase in self.phases},
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    def export_csv(self, path):
+        """Сохранение значений фаз по кадрам окна в CSV."""
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame'] + self.phases)
+            columns = [self.history[phase] for phase in self.phases]
+            first = self.frames - len(columns[0]) if columns else 0
+            for number, row in enumerate(zip(*columns)):
+                writer.writerow([first + number, *row])
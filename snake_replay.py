@@ -0,0 +1,204 @@
+import mmap
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from snake_engine import (DIRECTION_CODES, DIRECTIONS, Board, GameEngine,
+                          SnakeModel)
+
+# Заголовок файла с записями игр
+REPLAY_MAGIC = b'SNKR'
+REPLAY_VERSION = 1
+REPLAY_HEADER = REPLAY_MAGIC + bytes((REPLAY_VERSION,))
+
+# Зерно генератора яблок хранится как 8 байт без знака
+SEED_FORMAT = struct.Struct('<Q')
+
+# Запись одной игры: повороты - список пар (тик, новое направление)
+Replay = namedtuple('Replay', 'seed width height ticks turns')
+
+
+def write_varint(buffer, value):
+    """Дописываем в буфер целое число переменной длины (LEB128)."""
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, offset):
+    """Читаем число переменной длины, возвращаем его и новое смещение."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_replay(replay):
+    """Упаковка записи игры в байты.
+
+    Формат: длина записи, зерно, ширина и высота поля, число тиков и
+    повороты. Каждый поворот - одно число: разница тиков с предыдущим
+    поворотом, сдвинутая на 2 бита, и код направления в младших битах.
+    """
+    payload = bytearray(SEED_FORMAT.pack(replay.seed))
+    write_varint(payload, replay.width)
+    write_varint(payload, replay.height)
+    write_varint(payload, replay.ticks)
+    last_tick = 0
+    for tick, direction in replay.turns:
+        write_varint(payload,
+                     (tick - last_tick) << 2 | DIRECTION_CODES[direction])
+        last_tick = tick
+    record = bytearray()
+    write_varint(record, len(payload))
+    return bytes(record + payload)
+
+
+def decode_replay(data, offset=0):
+    """Распаковка записи игры, начинающейся со смещения offset."""
+    length, offset = read_varint(data, offset)
+    end = offset + length
+    (seed,) = SEED_FORMAT.unpack_from(data, offset)
+    offset += SEED_FORMAT.size
+    width, offset = read_varint(data, offset)
+    height, offset = read_varint(data, offset)
+    ticks, offset = read_varint(data, offset)
+    turns = []
+    tick = 0
+    while offset < end:
+        value, offset = read_varint(data, offset)
+        tick += value >> 2
+        turns.append((tick, DIRECTIONS[value & 3]))
+    return Replay(seed, width, height, ticks, turns)
+
+
+class ReplayRecorder:
+    """Запись игры: зерно генератора и тики, на которых змейка повернула."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.start()
+
+    def start(self):
+        """Начинаем запись новой игры."""
+        self.turns = []
+        self.direction = self.engine.snake.direction
+
+    def record(self, state):
+        """Запоминаем поворот, если он произошел на этом тике."""
+        if state.direction != self.direction:
+            self.direction = state.direction
+            self.turns.append((state.ticks, state.direction))
+
+    def finish(self):
+        """Запись сыгранной игры в упакованном виде."""
+        engine = self.engine
+        board = engine.snake.board
+        return encode_replay(Replay(engine.seed, board.width, board.height,
+                                    engine.ticks, self.turns))
+
+
+class ReplayWriter:
+    """Дописывание записей игр в файл."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, record):
+        """Добавляем упакованную запись игры в конец файла."""
+        with open(self.path, 'ab') as file:
+            if file.tell() == 0:
+                file.write(REPLAY_HEADER)
+            file.write(record)
+
+
+class ReplayFile:
+    """Файл с записями игр, отображенный в память.
+
+    При открытии строится только индекс смещений записей, сами записи
+    распаковываются по запросу.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f'Файл {path} пуст.')
+        if self.data[:len(REPLAY_HEADER)] != REPLAY_HEADER:
+            self.close()
+            raise ValueError(f'Файл {path} не содержит записей игр.')
+        self.offsets = array('Q')
+        offset = len(REPLAY_HEADER)
+        while offset < len(self.data):
+            self.offsets.append(offset)
+            length, offset = read_varint(self.data, offset)
+            offset += length
+
+    def __len__(self):
+        """Количество записанных игр."""
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """Запись игры по её номеру."""
+        return decode_replay(self.data, self.offsets[index])
+
+    def __enter__(self):
+        """Файл можно открывать в конструкции with."""
+        return self
+
+    def __exit__(self, *args):
+        """Закрытие файла при выходе из with."""
+        self.close()
+
+    def close(self):
+        """Закрытие файла."""
+        self.data.close()
+        self.file.close()
+
+
+def playback(replay, engine=None):
+    """Повтор записанной игры.
+
+    Генератор возвращает (state, events) для каждого тика. Можно передать
+    свой GameEngine, например с объектами, которые умеют рисоваться.
+    """
+    if engine is None:
+        board = Board(replay.width, replay.height)
+        engine = GameEngine(SnakeModel(board), seed=replay.seed)
+    else:
+        engine.reset(replay.seed)
+    turns = dict(replay.turns)
+    for tick in range(1, replay.ticks + 1):
+        yield engine.step(turns.get(tick))
+
+
+def fast_forward(replay):
+    """Прогон записанной игры без отрисовки, возвращает итоговое состояние."""
+    board = Board(replay.width, replay.height)
+    engine = GameEngine(SnakeModel(board), seed=replay.seed)
+    for _ in playback(replay, engine):
+        pass
+    return engine.state()
+
+
+def main(path):
+    """Краткая сводка по всем играм из файла записей."""
+    with ReplayFile(path) as replays:
+        for number in range(len(replays)):
+            replay = replays[number]
+            state = fast_forward(replay)
+            print(f'{number}: зерно {replay.seed}, тиков {replay.ticks}, '
+                  f'поворотов {len(replay.turns)}, счёт {state.score}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,256 @@
+import argparse
+import heapq
+import os
+import queue
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter, namedtuple
+
+from snake_engine import NO_CELL
+
+# Заголовок файла с результатами игр
+RESULTS_MAGIC = b'SNKS'
+RESULTS_VERSION = 1
+RESULTS_HEADER = RESULTS_MAGIC + bytes((RESULTS_VERSION,))
+
+# Результаты пишутся блоками: число игр в блоке, затем каждая колонка
+# подряд как массив значений в порядке байт little-endian
+BLOCK_HEADER = struct.Struct('<I')
+
+# Колонки результатов и типы их значений в модуле array
+RESULT_COLUMNS = (
+    ('score', 'I'),
+    ('ticks', 'I'),
+    ('speed', 'd'),
+    ('length', 'I'),
+    ('death_cell', 'i'),
+    ('duration', 'd'),
+    ('seed', 'Q'),
+)
+
+# Сколько игр собирается в блок, прежде чем он пишется в файл
+RESULTS_BLOCK = 4096
+
+# Через сколько секунд без новых игр неполный блок все равно пишется
+RESULTS_FLUSH_INTERVAL = 5.0
+
+# Точность, с которой считаются значения дробных колонок
+RESULTS_RESOLUTION = {'speed': 0.1, 'duration': 0.1}
+
+# Колонки, по которым считаются сводки: у них мало разных значений. У
+# зерна и ячейки смерти почти все значения разные, счетчик рос бы с
+# числом игр
+AGGREGATE_COLUMNS = ('score', 'ticks', 'speed', 'length', 'duration')
+
+# Результат одной законченной игры. death_cell - ячейка, где змейка
+# врезалась в себя, или NO_CELL
+GameRecord = namedtuple('GameRecord', [name for name, _ in RESULT_COLUMNS])
+
+
+def game_record(engine, duration):
+    """Результат законченной игры движка engine."""
+    snake = engine.snake
+    death_cell = snake.head_cell() if snake.check_collision() else NO_CELL
+    return GameRecord(engine.score, engine.ticks, snake.speed, snake.length,
+                      death_cell, duration, engine.seed)
+
+
+class ResultLog:
+    """Дописывание результатов игр в файл в фоновом потоке.
+
+    add только кладет результат в очередь, поэтому игра не ждет диска.
+    Поток собирает результаты в колонки и пишет их целым блоком, когда
+    блок заполнен, когда новых игр долго нет и при закрытии.
+    """
+
+    def __init__(self, path, block_size=RESULTS_BLOCK,
+                 flush_interval=RESULTS_FLUSH_INTERVAL):
+        self.path = path
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.columns = {name: array(typecode)
+                        for name, typecode in RESULT_COLUMNS}
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def add(self, record):
+        """Результат одной игры."""
+        self.queue.put(record)
+
+    def extend(self, records):
+        """Результаты нескольких игр."""
+        for record in records:
+            self.queue.put(record)
+
+    def work(self):
+        """Фоновый поток: сбор результатов в блоки и их запись."""
+        columns = self.columns
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.write_block()
+                continue
+            if record is None:
+                break
+            for name, value in zip(GameRecord._fields, record):
+                columns[name].append(value)
+            if len(columns['score']) >= self.block_size:
+                self.write_block()
+        self.write_block()
+
+    def write_block(self):
+        """Запись собранных результатов одним блоком."""
+        count = len(self.columns['score'])
+        if not count:
+            return
+        parts = [BLOCK_HEADER.pack(count)]
+        for values in self.columns.values():
+            if sys.byteorder == 'big':
+                values.byteswap()
+            parts.append(values.tobytes())
+            del values[:]
+        with open(self.path, 'ab') as file:
+            if file.tell() == 0:
+                file.write(RESULTS_HEADER)
+            file.write(b''.join(parts))
+
+    def close(self):
+        """Запись оставшихся результатов и остановка потока."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+def read_blocks(path, columns=GameRecord._fields):
+    """Блоки файла по очереди: колонка -> массив значений.
+
+    Читаются только нужные колонки, остальные пропускаются, поэтому в
+    памяти одновременно лежит не больше одного блока. Недописанный блок
+    в конце файла не читается.
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(RESULTS_HEADER)) != RESULTS_HEADER:
+            raise ValueError(f'Файл {path} не содержит результаты игр.')
+        file_size = os.fstat(file.fileno()).st_size
+        while True:
+            header = file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            (count,) = BLOCK_HEADER.unpack(header)
+            sizes = [count * array(typecode).itemsize
+                     for _, typecode in RESULT_COLUMNS]
+            if file.tell() + sum(sizes) > file_size:
+                return
+            block = {}
+            for (name, typecode), size in zip(RESULT_COLUMNS, sizes):
+                if name not in columns:
+                    file.seek(size, os.SEEK_CUR)
+                    continue
+                values = array(typecode)
+                values.frombytes(file.read(size))
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                block[name] = values
+            yield block
+
+
+def value_counts(path, column):
+    """Сколько раз встречается каждое значение колонки.
+
+    Дробные значения округляются до RESULTS_RESOLUTION, поэтому размер
+    счетчика не зависит от числа игр. Считаются только колонки из
+    AGGREGATE_COLUMNS.
+    """
+    if column not in AGGREGATE_COLUMNS:
+        raise ValueError(f'По колонке {column} сводка не считается.')
+    counts = Counter()
+    resolution = RESULTS_RESOLUTION.get(column)
+    for block in read_blocks(path, (column,)):
+        values = block[column]
+        if resolution is None:
+            counts.update(values)
+        else:
+            counts.update(round(value / resolution) * resolution
+                          for value in values)
+    return counts
+
+
+def count_percentile(counts, percent):
+    """Перцентиль по счетчику значений."""
+    total = sum(counts.values())
+    if not total:
+        return 0
+    rank = max(1, -(-total * percent // 100))
+    seen = 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen >= rank:
+            return value
+    return value
+
+
+def count_histogram(counts, bins):
+    """Гистограмма по счетчику значений: (начало, конец, число игр)."""
+    if not counts:
+        return []
+    low, high = min(counts), max(counts)
+    width = (high - low) / bins or 1
+    totals = [0] * bins
+    for value, number in counts.items():
+        totals[min(int((value - low) / width), bins - 1)] += number
+    return [(low + width * number, low + width * (number + 1), total)
+            for number, total in enumerate(totals)]
+
+
+def high_scores(path, count=10):
+    """Лучшие игры по счёту, от лучшей к худшей."""
+    best = []
+    for block in read_blocks(path):
+        # Целиком собираются только лучшие игры блока
+        scores = block['score']
+        rows = heapq.nlargest(count, range(len(scores)),
+                              key=scores.__getitem__)
+        best = heapq.nlargest(count, best + [
+            GameRecord(*(values[row] for values in block.values()))
+            for row in rows
+        ])
+    return best
+
+
+def main():
+    """Сводка по результатам игр из файла."""
+    parser = argparse.ArgumentParser(description='Результаты игр Змейки.')
+    parser.add_argument('path', help='файл результатов игр')
+    parser.add_argument('--column', default='score',
+                        choices=AGGREGATE_COLUMNS)
+    parser.add_argument('--bins', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    counts = value_counts(args.path, args.column)
+    total = sum(counts.values())
+    print(f'Игр: {total}')
+    if not total:
+        return
+    mean = sum(value * number for value, number in counts.items()) / total
+    percentiles = ', '.join(
+        f'p{percent} {count_percentile(counts, percent):g}'
+        for percent in (50, 90, 99))
+    print(f'{args.column}: среднее {mean:.2f}, {percentiles}')
+    histogram = count_histogram(counts, args.bins)
+    widest = max(number for _, _, number in histogram)
+    for low, high, number in histogram:
+        bar = '#' * round(40 * number / widest)
+        print(f'{low:10.1f} - {high:10.1f} {number:8} {bar}')
+    print('Лучшие игры:')
+    for record in high_scores(args.path, args.top):
+        print(f'счёт {record.score}, тиков {record.ticks}, '
+              f'длина {record.length}, зерно {record.seed}')
+
+
+if __name__ == '__main__':
+    main()
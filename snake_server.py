@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import struct
+import time
+from collections import deque
+from random import Random
+
+from snake_engine import (DIRECTIONS, SPEED_COEFFICIENT, SPEED_START,
+                          AppleModel, Board, SnakeModel)
+
+# Адрес сервера по умолчанию
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+
+# Размер общего поля комнаты в ячейках и число яблок на нём
+ROOM_WIDTH, ROOM_HEIGHT = 256, 192
+ROOM_APPLES = 64
+
+# Частота тиков сервера: вся комната движется с одной скоростью
+TICK_RATE = SPEED_START
+
+# Сколько последних тиков помнит сервер для статистики времени тика
+TICK_HISTORY = 4096
+
+# Сколько неотправленных байт может накопить клиент, прежде чем сервер
+# его отключит, чтобы медленное соединение не копило память
+MAX_CLIENT_BUFFER = 1 << 18
+
+# Кадр: длина и данные. Первый байт данных - тип кадра
+FRAME_HEADER = struct.Struct('<I')
+FRAME_SNAPSHOT = 1
+FRAME_DELTA = 2
+
+# Заголовки кадров и их записи
+SNAPSHOT_HEADER = struct.Struct('<BHHIIH')  # тип, поле, тик, id, яблоки
+DELTA_HEADER = struct.Struct('<BIqHHHH')  # тип, тик, время, 4 счётчика
+SNAKE_HEADER = struct.Struct('<II')  # id змейки, её длина
+MOVE_RECORD = struct.Struct('<III')  # id змейки, новая голова, хвост
+SPAWN_RECORD = struct.Struct('<II')  # id змейки, ячейка появления
+APPLE_RECORD = struct.Struct('<HI')  # номер яблока, ячейка
+CELL = struct.Struct('<I')
+
+# Вместо ячейки хвоста, если змейка съела яблоко и хвост остался на месте
+NO_CELL = 0xFFFFFFFF
+
+
+def frame(payload):
+    """Кадр для отправки: длина и данные."""
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class Room:
+    """Общее поле, на котором одновременно играют несколько змеек.
+
+    Сервер считает игру сам, клиенты только присылают повороты. После
+    каждого тика комната отдаёт дельту: для каждой змейки новую голову и
+    освободившуюся ячейку хвоста, появившиеся и погибшие змейки и
+    переставленные яблоки.
+    """
+
+    def __init__(self, width=ROOM_WIDTH, height=ROOM_HEIGHT,
+                 apples=ROOM_APPLES, seed=None):
+        self.board = Board(width, height)
+        self.rng = Random(seed)
+        self.snakes = {}
+        self.scores = {}
+        self.next_id = 0
+        self.tick = 0
+        # Змейки, которые появятся на поле в начале следующего тика
+        self.waiting = []
+        # Змейки, убранные с поля между тиками: о них сообщается в дельте
+        # вместе с погибшими
+        self.gone = []
+        self.apples = [AppleModel(width, height, self.rng)
+                       for _ in range(apples)]
+        # Ячейки, где лежат яблоки: ячейка -> номер яблока
+        self.apple_cells = {}
+        for number in range(apples):
+            self.place_apple(number)
+
+    def join(self):
+        """Новый игрок. Его змейка появится на поле на следующем тике."""
+        snake_id = self.next_id
+        self.next_id += 1
+        self.waiting.append(snake_id)
+        self.scores[snake_id] = 0
+        return snake_id
+
+    def leave(self, snake_id):
+        """Игрок ушёл: его змейка убирается с поля."""
+        snake = self.snakes.pop(snake_id, None)
+        if snake is not None:
+            snake.remove()
+            self.gone.append(snake_id)
+        elif snake_id in self.waiting:
+            self.waiting.remove(snake_id)
+        self.scores.pop(snake_id, None)
+
+    def turn(self, snake_id, code):
+        """Поворот змейки по коду направления из DIRECTIONS."""
+        snake = self.snakes.get(snake_id)
+        if snake is not None:
+            snake.turn(DIRECTIONS[code & 3])
+
+    def free_cell(self):
+        """Случайная свободная ячейка без яблока или None."""
+        free_cells = self.board.free_cells
+        # Яблоки лежат только в свободных ячейках: если ячеек не больше,
+        # чем яблок, свободной ячейки без яблока может не быть
+        if len(free_cells) <= len(self.apple_cells):
+            return None
+        cell = free_cells.choice(self.rng)
+        while cell in self.apple_cells:
+            cell = free_cells.choice(self.rng)
+        return cell
+
+    def place_apple(self, number):
+        """Ставим яблоко в ячейку, где нет змеек и других яблок."""
+        cell = self.free_cell()
+        if cell is None:
+            return False
+        self.apples[number].position = self.board.position(cell)
+        self.apple_cells[cell] = number
+        return True
+
+    def spawn(self, snake_id):
+        """Ставим змейку в случайную свободную ячейку без яблока."""
+        cell = self.free_cell()
+        if cell is None:
+            return None
+        snake = SnakeModel(self.board, self.board.position(cell))
+        snake.direction = self.rng.choice(DIRECTIONS)
+        self.snakes[snake_id] = snake
+        return cell
+
+    def step(self):
+        """Один тик комнаты, возвращает кадр с дельтой состояния."""
+        self.tick += 1
+        spawns = self.spawn_waiting()
+        for snake in self.snakes.values():
+            snake.update_direction()
+            snake.move()
+        eaten = self.eat_apples()
+
+        # Столкновения проверяются после всех ходов: в одну ячейку могут
+        # одновременно прийти головы нескольких змеек
+        index = self.board.index
+        moves = []
+        collided = []
+        for snake_id, snake in self.snakes.items():
+            head = snake.head_cell()
+            tail = NO_CELL if snake.last_cell is None else snake.last_cell
+            moves.append((snake_id, head, tail))
+            if snake.check_collision():
+                collided.append(snake_id)
+        for snake_id in collided:
+            # Погибшая змейка снова появится на следующем тике
+            self.snakes.pop(snake_id).remove()
+            self.scores[snake_id] = 0
+            self.waiting.append(snake_id)
+        deaths, self.gone = self.gone + collided, []
+
+        apples = []
+        for number in eaten:
+            if self.place_apple(number):
+                apples.append((number, index(self.apples[number].position)))
+        return self.encode_delta(moves, deaths, spawns, apples)
+
+    def spawn_waiting(self):
+        """Выпускаем на поле ожидающие змейки, возвращаем их ячейки."""
+        spawns = []
+        waiting, self.waiting = self.waiting, []
+        for snake_id in waiting:
+            cell = self.spawn(snake_id)
+            if cell is None:
+                # Места нет - ждём следующего тика
+                self.waiting.append(snake_id)
+            else:
+                spawns.append((snake_id, cell))
+        return spawns
+
+    def eat_apples(self):
+        """Змейки съедают яблоки, возвращаем номера съеденных яблок."""
+        apple_cells = self.apple_cells
+        eaten = []
+        for snake_id, snake in self.snakes.items():
+            number = apple_cells.pop(snake.head_cell(), None)
+            if number is not None:
+                snake.grow()
+                snake.speed *= 1 + SPEED_COEFFICIENT / 100
+                self.scores[snake_id] += 1
+                eaten.append(number)
+        return eaten
+
+    def encode_delta(self, moves, deaths, spawns, apples):
+        """Упаковка дельты тика в кадр."""
+        payload = bytearray(DELTA_HEADER.pack(
+            FRAME_DELTA, self.tick, time.monotonic_ns(),
+            len(moves), len(deaths), len(spawns), len(apples)
+        ))
+        for move in moves:
+            payload += MOVE_RECORD.pack(*move)
+        for snake_id in deaths:
+            payload += CELL.pack(snake_id)
+        for spawn in spawns:
+            payload += SPAWN_RECORD.pack(*spawn)
+        for apple in apples:
+            payload += APPLE_RECORD.pack(*apple)
+        return frame(payload)
+
+    def snapshot(self, snake_id):
+        """Полное состояние комнаты для только что подключившегося игрока."""
+        board = self.board
+        index = board.index
+        payload = bytearray(SNAPSHOT_HEADER.pack(
+            FRAME_SNAPSHOT, board.width, board.height, self.tick, snake_id,
+            len(self.apples)
+        ))
+        for apple in self.apples:
+            payload += CELL.pack(index(apple.position))
+        payload += CELL.pack(len(self.snakes))
+        for other_id, snake in self.snakes.items():
+            payload += SNAKE_HEADER.pack(other_id, snake.length)
+            for cell in snake.iter_cells():
+                payload += CELL.pack(cell)
+        return frame(payload)
+
+
+def decode_delta(payload):
+    """Распаковка дельты тика.
+
+    Возвращает тик, время отправки и списки ходов, погибших змеек,
+    появившихся змеек и переставленных яблок.
+    """
+    (_, tick, sent, moves, deaths, spawns,
+     apples) = DELTA_HEADER.unpack_from(payload)
+    offset = DELTA_HEADER.size
+    result = []
+    for record, count in ((MOVE_RECORD, moves), (CELL, deaths),
+                          (SPAWN_RECORD, spawns), (APPLE_RECORD, apples)):
+        end = offset + record.size * count
+        result.append(list(record.iter_unpack(payload[offset:end])))
+        offset = end
+    moves, deaths, spawns, apples = result
+    deaths = [snake_id for snake_id, in deaths]
+    return tick, sent, moves, deaths, spawns, apples
+
+
+class GameServer:
+    """Сервер одной комнаты: принимает повороты и рассылает дельты."""
+
+    def __init__(self, room=None, tick_rate=TICK_RATE):
+        self.room = Room() if room is None else room
+        self.interval = 1 / tick_rate
+        self.clients = {}
+        # Время расчёта и рассылки последних TICK_HISTORY тиков, в секундах
+        self.tick_times = deque(maxlen=TICK_HISTORY)
+
+    async def handle_client(self, reader, writer):
+        """Соединение одного игрока: каждый байт - код поворота."""
+        room = self.room
+        snake_id = room.join()
+        self.clients[writer] = snake_id
+        writer.write(room.snapshot(snake_id))
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data:
+                    break
+                # Важен только последний присланный поворот
+                room.turn(snake_id, data[-1])
+        except ConnectionError:
+            pass
+        finally:
+            self.drop(writer)
+
+    def drop(self, writer):
+        """Отключение игрока."""
+        snake_id = self.clients.pop(writer, None)
+        if snake_id is not None:
+            self.room.leave(snake_id)
+            writer.close()
+
+    def broadcast(self, data):
+        """Рассылка кадра всем игрокам."""
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+                self.drop(writer)
+            else:
+                writer.write(data)
+
+    async def tick_loop(self):
+        """Тики идут по расписанию и не накапливают отставание."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.interval
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            start = time.perf_counter()
+            self.broadcast(self.room.step())
+            self.tick_times.append(time.perf_counter() - start)
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT):
+        """Запуск сервера до отмены задачи."""
+        server = await asyncio.start_server(self.handle_client, host, port,
+                                            limit=1 << 10, backlog=1 << 12)
+        async with server:
+            await self.tick_loop()
+
+
+class LoadClient:
+    """Клиент генератора нагрузки: случайные повороты и учёт задержек."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.frames = 0
+        self.bytes = 0
+        self.latencies = []
+
+    async def run(self, host, port, deadline):
+        """Играем до deadline по часам time.monotonic."""
+        try:
+            await asyncio.wait_for(self.play(host, port, deadline),
+                                   deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            pass
+
+    async def play(self, host, port, deadline):
+        """Читаем кадры и изредка поворачиваем."""
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while time.monotonic() < deadline:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (length,) = FRAME_HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                self.frames += 1
+                self.bytes += FRAME_HEADER.size + length
+                if payload[0] != FRAME_DELTA:
+                    continue
+                # Разбираем только заголовок: генератор нагрузки должен
+                # нагружать сервер, а не собственный процессор
+                _, _, sent, *_ = DELTA_HEADER.unpack_from(payload)
+                self.latencies.append(time.monotonic_ns() - sent)
+                if self.rng.random() < 0.2:
+                    writer.write(bytes((self.rng.randrange(4),)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentile(values, fraction):
+    """Перцентиль из отсортированного списка."""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def load_test(clients, duration, host=SERVER_HOST, port=SERVER_PORT,
+                    seed=None):
+    """Подключаем clients игроков на duration секунд и печатаем сводку."""
+    rng = Random(seed)
+    deadline = time.monotonic() + duration
+    players = [LoadClient(Random(rng.getrandbits(64)))
+               for _ in range(clients)]
+    await asyncio.gather(*(player.run(host, port, deadline)
+                           for player in players))
+    latencies = sorted(latency for player in players
+                       for latency in player.latencies)
+    frames = sum(player.frames for player in players)
+    received = sum(player.bytes for player in players)
+    print(f'Клиентов: {clients}, кадров: {frames} '
+          f'({frames / duration:.0f}/с), '
+          f'байт: {received} ({received / duration / 1024:.0f} КиБ/с)')
+    print('Задержка тика, мс: '
+          f'p50 {percentile(latencies, 0.5) / 1e6:.2f}, '
+          f'p95 {percentile(latencies, 0.95) / 1e6:.2f}, '
+          f'p99 {percentile(latencies, 0.99) / 1e6:.2f}')
+    return players
+
+
+async def serve_and_report(server, host, port, report):
+    """Сервер, который каждые report секунд печатает время тиков."""
+    task = asyncio.create_task(server.serve(host, port))
+    try:
+        while True:
+            await asyncio.sleep(report)
+            times = sorted(server.tick_times)
+            server.tick_times.clear()
+            print(f'Змеек: {len(server.room.snakes)}, '
+                  f'соединений: {len(server.clients)}, '
+                  f'тик p50 {percentile(times, 0.5) * 1e3:.2f} мс, '
+                  f'p99 {percentile(times, 0.99) * 1e3:.2f} мс')
+    finally:
+        task.cancel()
+
+
+def main():
+    """Запуск сервера или генератора нагрузки из командной строки."""
+    parser = argparse.ArgumentParser(description='Сервер Змейки.')
+    parser.add_argument('mode', choices=('serve', 'load'))
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--clients', type=int, default=100,
+                        help='число игроков генератора нагрузки')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='длительность нагрузки в секундах')
+    parser.add_argument('--report', type=float, default=5,
+                        help='как часто сервер печатает статистику')
+    args = parser.parse_args()
+    if args.mode == 'serve':
+        coroutine = serve_and_report(GameServer(), args.host, args.port,
+                                     args.report)
+    else:
+        coroutine = load_test(args.clients, args.duration, args.host,
+                              args.port)
+    try:
+        asyncio.run(coroutine)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import csv
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from random import Random
+
+from snake_autopilot import Autopilot
+from snake_engine import (DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, Board,
+                          GameEngine, SnakeModel)
+from snake_results import ResultLog, game_record
+
+# Сколько игр отправляется рабочему процессу за раз
+TOURNAMENT_CHUNK = 64
+
+# Игра без смерти заканчивается по тайм-ауту после стольких тиков
+TOURNAMENT_MAX_TICKS = 100_000
+
+# Причина конца игры, которая не входит в события GameEngine
+CAUSE_TIMEOUT = 'timeout'
+
+# Вероятность случайного поворота у агента random
+RANDOM_TURN_CHANCE = 0.1
+
+# Результат одной игры турнира
+GameResult = namedtuple('GameResult',
+                        'game seed agent score ticks cause seconds')
+
+
+def straight_agent(engine, rng):
+    """Агент, который никогда не поворачивает."""
+    return lambda state: None
+
+
+def random_agent(engine, rng):
+    """Агент, который изредка поворачивает в случайную сторону."""
+    def agent(state):
+        if rng.random() < RANDOM_TURN_CHANCE:
+            return rng.choice(DIRECTIONS)
+        return None
+    return agent
+
+
+def greedy_agent(engine, rng):
+    """Агент, который идет к яблоку кратчайшим путем по замкнутому полю.
+
+    Из направлений, приближающих к яблоку, выбирает первое, которое не
+    ведет в занятую ячейку, а если таких нет - любое безопасное.
+    """
+    snake = engine.snake
+    board = snake.board
+
+    def distance(position, target):
+        dx = abs(position[0] - target[0])
+        dy = abs(position[1] - target[1])
+        return (min(dx, board.width - dx) + min(dy, board.height - dy))
+
+    def agent(state):
+        head_x, head_y = state.head
+        # Хвост уйдет за этот ход, если змейка не съест яблоко
+        tail = board.position(snake.cell(-1))
+        choices = []
+        for direction in DIRECTIONS:
+            if direction == (-state.direction[0], -state.direction[1]):
+                continue
+            position = ((head_x + direction[0]) % board.width,
+                        (head_y + direction[1]) % board.height)
+            if (not board.is_occupied(position)
+                    or position == tail != state.apple):
+                choices.append((distance(position, state.apple), direction))
+        if not choices:
+            return None
+        return min(choices)[1]
+    return agent
+
+
+def autopilot_agent(engine, rng):
+    """Автопилот с поиском пути к яблоку."""
+    return Autopilot(engine.snake, engine.apple)
+
+
+# Агенты турнира: имя -> фабрика agent(engine, rng), которая возвращает
+# функцию, выбирающую направление по состоянию игры
+AGENTS = {
+    'straight': straight_agent,
+    'random': random_agent,
+    'greedy': greedy_agent,
+    'autopilot': autopilot_agent,
+}
+
+
+def game_seed(seed, number):
+    """Зерно игры с номером number в турнире с зерном seed."""
+    return (seed + number) % (1 << 64)
+
+
+def play_game(number, seed, agent_name, width=GRID_WIDTH,
+              height=GRID_HEIGHT, max_ticks=TOURNAMENT_MAX_TICKS,
+              records=None):
+    """Одна игра без отрисовки от начала до конца.
+
+    Если передан список records, в него добавляется GameRecord игры.
+    """
+    start = time.perf_counter()
+    engine = GameEngine(SnakeModel(Board(width, height)), seed=seed)
+    agent = AGENTS[agent_name](engine, Random(seed))
+    state, events = engine.state(), ()
+    while not engine.game_over and engine.ticks < max_ticks:
+        state, events = engine.step(agent(state))
+    cause = events[-1] if engine.game_over else CAUSE_TIMEOUT
+    seconds = time.perf_counter() - start
+    if records is not None:
+        records.append(game_record(engine, seconds))
+    return GameResult(number, seed, agent_name, engine.score, engine.ticks,
+                      cause, seconds)
+
+
+def play_chunk(games, width, height, max_ticks):
+    """Пачка игр в рабочем процессе: список (номер, зерно, агент).
+
+    Возвращает результаты игр для таблицы и их GameRecord для журнала.
+    """
+    records = []
+    results = [play_game(number, seed, agent, width, height, max_ticks,
+                         records)
+               for number, seed, agent in games]
+    return results, records
+
+
+def read_results(path):
+    """Результаты уже сыгранных игр из файла.
+
+    Недописанная строка в конце файла (например, после прерывания)
+    обрезается, чтобы дописывание продолжилось с целой строки.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb+') as file:
+        data = file.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            file.truncate(end)
+    with open(path, encoding='utf-8', newline='') as file:
+        rows = list(csv.reader(file))
+    return [
+        GameResult(int(game), int(seed), agent, int(score), int(ticks),
+                   cause, float(seconds))
+        for game, seed, agent, score, ticks, cause, seconds in rows[1:]
+    ]
+
+
+class Tournament:
+    """Турнир агентов: много игр на пуле процессов.
+
+    Игра с номером n достается агенту agents[n % len(agents)] и получает
+    зерно game_seed(seed, n), поэтому турнир можно прервать и продолжить:
+    игры, уже записанные в файл результатов, повторно не играются.
+    Если передан журнал log (ResultLog), результаты пишутся и в него.
+    """
+
+    def __init__(self, path, games, agents=tuple(AGENTS), seed=0,
+                 width=GRID_WIDTH, height=GRID_HEIGHT,
+                 max_ticks=TOURNAMENT_MAX_TICKS, chunk=TOURNAMENT_CHUNK,
+                 log=None):
+        self.path = path
+        self.games = games
+        self.agents = list(agents)
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.max_ticks = max_ticks
+        self.chunk = chunk
+        self.log = log
+
+    def pending(self):
+        """Игры, которых еще нет в файле результатов."""
+        finished = {result.game for result in read_results(self.path)}
+        return [
+            (number, game_seed(self.seed, number),
+             self.agents[number % len(self.agents)])
+            for number in range(self.games) if number not in finished
+        ]
+
+    def run(self, workers=None):
+        """Играем оставшиеся игры, отдавая результаты пачками.
+
+        Каждая пачка дописывается в файл сразу после того, как рабочий
+        процесс её вернул.
+        """
+        games = self.pending()
+        chunks = [games[start:start + self.chunk]
+                  for start in range(0, len(games), self.chunk)]
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'a', encoding='utf-8', newline='') as file, \
+                ProcessPoolExecutor(workers) as executor:
+            writer = csv.writer(file)
+            if new_file:
+                writer.writerow(GameResult._fields)
+            futures = [
+                executor.submit(play_chunk, chunk, self.width, self.height,
+                                self.max_ticks)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                results, records = future.result()
+                writer.writerows(results)
+                file.flush()
+                if self.log is not None:
+                    self.log.extend(records)
+                yield results
+
+
+def summary(results):
+    """Средние счёт и длительность игр по агентам."""
+    by_agent = {}
+    for result in results:
+        by_agent.setdefault(result.agent, []).append(result)
+    return {
+        agent: {
+            'games': len(games),
+            'score': sum(game.score for game in games) / len(games),
+            'ticks': sum(game.ticks for game in games) / len(games),
+            'best': max(game.score for game in games),
+        }
+        for agent, games in by_agent.items()
+    }
+
+
+def main():
+    """Запуск турнира из командной строки."""
+    parser = argparse.ArgumentParser(description='Турнир агентов Змейки.')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--agents', default=','.join(AGENTS),
+                        help='имена агентов через запятую')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='tournament.csv')
+    parser.add_argument('--log', default=None,
+                        help='журнал результатов игр (snake_results.py)')
+    args = parser.parse_args()
+    log = None if args.log is None else ResultLog(args.log)
+    tournament = Tournament(args.output, args.games,
+                            args.agents.split(','), args.seed, log=log)
+    start = time.perf_counter()
+    played = 0
+    try:
+        for results in tournament.run(args.workers):
+            played += len(results)
+            print(f'Сыграно {played} игр за '
+                  f'{time.perf_counter() - start:.1f} с')
+    finally:
+        if log is not None:
+            log.close()
+    for agent, values in summary(read_results(args.output)).items():
+        print(f'{agent}: игр {values["games"]}, '
+              f'средний счёт {values["score"]:.2f}, '
+              f'лучший {values["best"]}, '
+              f'средняя длина игры {values["ticks"]:.0f} тиков')
+
+
+if __name__ == '__main__':
+    main()
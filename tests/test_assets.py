@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import pygame
+
+from conftest import BASE_DIR
+from snake_assets import AssetManager
+
+
+def test_sprites_are_loaded_once(_the_snake, monkeypatch):
+    pygame.init()
+    loads = []
+    original_load = pygame.image.load
+    monkeypatch.setattr(pygame.image, 'load',
+                        lambda path: loads.append(path) or original_load(path))
+    assets = AssetManager(angles=_the_snake.SPRITE_ANGLES, size=20)
+    monkeypatch.setattr(_the_snake, 'assets', assets)
+    first, second = _the_snake.Snake(), _the_snake.Snake()
+    _the_snake.Apple()
+    assert len(loads) == len(assets.names)
+    assert first.sprites[('head', 90)] is second.sprites[('head', 90)]
+    # Все спрайты - части одного атласа
+    assert first.sprites[('head', 90)].get_parent() is assets.atlas
+
+
+def test_atlas_file_matches_images(tmp_path):
+    pygame.init()
+    angles = (0, 90, 180, 270)
+    path = tmp_path / 'atlas.snka'
+    built = AssetManager(angles=angles)
+    built.save(path)
+    loaded = AssetManager(angles=angles, atlas_file=path)
+    for name in built.names:
+        for angle in angles:
+            assert pygame.image.tobytes(
+                built.sprite(name, angle), 'RGBA') == pygame.image.tobytes(
+                loaded.sprite(name, angle), 'RGBA')
+    assert loaded.mapping is not None
+
+
+def test_atlas_is_scaled_once():
+    pygame.init()
+    assets = AssetManager(size=20)
+    assets.load()
+    source = assets.source
+    assets.set_size(32)
+    assert assets.sprite('apple').get_size() == (32, 32)
+    assert assets.source is source
+    assert assets.atlas.get_height() == 32
+
+
+def test_import_and_sprites_from_other_directory(tmp_path):
+    code = ('import pygame, the_snake; pygame.init(); '
+            'print(the_snake.assets.files is None, '
+            'the_snake.Snake().sprites[("head", 0)].get_size())')
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=tmp_path, capture_output=True, text=True, check=True,
+        env={'SDL_VIDEODRIVER': 'dummy', 'PATH': '',
+             'PYTHONPATH': str(BASE_DIR)},
+    )
+    # Папка с изображениями не читается при импорте
+    assert result.stdout.split()[-3:] == ['True', '(20,', '20)']
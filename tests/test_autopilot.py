@@ -0,0 +1,52 @@
+import pygame
+import pytest
+
+from snake_autopilot import Autopilot
+from snake_engine import EVENT_COLLISION, Board, GameEngine, SnakeModel
+from snake_levels import Level
+from snake_replay import ReplayRecorder, ReplayWriter
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_autopilot_does_not_crash(seed):
+    engine = GameEngine(SnakeModel(Board(12, 10)), seed=seed)
+    autopilot = Autopilot(engine.snake, engine.apple)
+    buffers = autopilot.seen, autopilot.parent, autopilot.queue
+    events = ()
+    while not engine.game_over and engine.ticks < 10000:
+        _, events = engine.step(autopilot())
+    assert EVENT_COLLISION not in events
+    assert engine.score >= 60
+    # Буферы поиска создаются один раз
+    assert (autopilot.seen, autopilot.parent, autopilot.queue) == buffers
+
+
+def test_autopilot_replaces_keyboard(_the_snake, tmp_path):
+    pygame.init()
+    snake = _the_snake.Snake(board=Board())
+    game = GameEngine(snake, _the_snake.Apple())
+    loop = _the_snake.GameLoop(game, _the_snake.InfoBoard(),
+                               ReplayRecorder(game),
+                               ReplayWriter(tmp_path / 'replays.snr'))
+    loop.pressed_keys.append(_the_snake.AUTOPILOT_KEY)
+    assert not loop.control_keys()
+    assert loop.autopilot is not None
+    head_x, head_y = snake.get_head_position()
+    game.apple.position = (head_x, (head_y - 3) % game.snake.board.height)
+    assert loop.next_turn() == _the_snake.UP
+
+
+def test_autopilot_avoids_dead_end_between_walls():
+    level = Level.from_text('######\n#....#\n#.##.#\n#....#\n###.##')
+    engine = GameEngine(SnakeModel(Board(6, 5, level)), seed=1)
+    snake = engine.snake
+    snake.remove()
+    snake.positions = [(2, 3), (1, 3), (1, 2)]
+    for cell in snake.iter_cells():
+        snake.board.occupy(cell)
+    # Яблоко в тупике: съев его, змейка не сможет развернуться
+    engine.apple.position = (3, 4)
+    autopilot = Autopilot(snake, engine.apple)
+    for _ in range(20):
+        engine.step(autopilot())
+        assert not engine.game_over
@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from snake_batch import NO_ACTION, BatchGame
+from snake_engine import DIRECTIONS, EVENT_COLLISION, GameEngine
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_engine(seed):
+    engine = GameEngine()
+    batch = BatchGame(1, seed=seed)
+    board = engine.snake.board
+    actions = random.Random(seed)
+    for _ in range(2000):
+        # Яблоки ставим туда же, где они появились в одиночной игре
+        batch.apple[0] = board.index(engine.apple.position)
+        code = actions.randrange(NO_ACTION, len(DIRECTIONS))
+        state, events = engine.step(
+            None if code == NO_ACTION else DIRECTIONS[code])
+        batch_events = batch.step(np.array([code]))
+        assert batch.positions(0) == list(engine.snake.positions)
+        assert batch_events[EVENT_COLLISION][0] == (EVENT_COLLISION in events)
+        if state.game_over:
+            break
+    assert batch.score[0] == engine.score
+    assert batch.speed[0] == pytest.approx(engine.snake.speed)
+
+
+def test_finished_games_do_not_move():
+    batch = BatchGame(3, seed=0)
+    batch.done[1] = True
+    heads = batch.heads()
+    batch.step()
+    assert batch.heads()[1] == heads[1]
+    assert batch.ticks.tolist() == [1, 0, 1]
+    batch.reset(batch.done)
+    assert not batch.done.any()
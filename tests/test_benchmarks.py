@@ -0,0 +1,192 @@
+"""Замеры скорости горячих участков игры.
+
+Результаты пишутся в JSON, если задана переменная окружения
+SNAKE_BENCH_OUTPUT. Если задана SNAKE_BENCH_BASELINE, каждый замер
+сравнивается с сохраненным ранее файлом, и тест падает, когда операция
+стала медленнее базового значения больше, чем на SNAKE_BENCH_TOLERANCE
+(по умолчанию 1.0, то есть вдвое).
+
+Скорость машины от запуска к запуску плавает, поэтому сравниваются не
+наносекунды, а отношение замера к калибровочному циклу на чистом Python,
+который выполняется в том же запуске.
+"""
+import json
+import os
+import time
+from collections import deque
+from random import Random
+
+import pygame
+import pytest
+
+from snake_autopilot import Autopilot
+from snake_engine import RIGHT, AppleModel, Board
+
+BENCH_OUTPUT = os.environ.get('SNAKE_BENCH_OUTPUT')
+BENCH_BASELINE = os.environ.get('SNAKE_BENCH_BASELINE')
+BENCH_TOLERANCE = float(os.environ.get('SNAKE_BENCH_TOLERANCE', 1.0))
+
+# Размеры поля в ячейках и длины змейки (целое - число элементов,
+# дробное - доля заполненного поля)
+BENCH_BOARDS = ((32, 24), (256, 192))
+BENCH_LENGTHS = (3, 0.5, 0.95)
+
+BENCH_REPEATS = 7
+BENCH_NUMBER = 1000
+# Полный поиск пути на большом поле занимает миллисекунды
+BENCH_AUTOPILOT_NUMBER = 5
+
+results = {}
+calibrations = {}
+
+
+def load_baseline():
+    if not BENCH_BASELINE:
+        return {}
+    with open(BENCH_BASELINE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+baseline = load_baseline()
+
+
+def calibration_loop():
+    total = 0
+    for value in range(100):
+        total += value
+    return total
+
+
+@pytest.fixture(scope='module', autouse=True)
+def bench_report(_the_snake):
+    pygame.init()
+    yield
+    if BENCH_OUTPUT:
+        with open(BENCH_OUTPUT, 'w', encoding='utf-8') as file:
+            json.dump({'unit': 'ns', 'results': results,
+                       'calibration': calibrations},
+                      file, indent=2, sort_keys=True)
+
+
+def serpentine(width, height):
+    """Обход поля змейкой: строки по очереди слева направо и обратно."""
+    for y in range(height):
+        xs = range(width) if y % 2 == 0 else range(width - 1, -1, -1)
+        for x in xs:
+            yield x, y
+
+
+def make_snake(module, width, height, length):
+    """Змейка заданной длины, уложенная по полю без самопересечений."""
+    if isinstance(length, float):
+        length = int(width * height * length)
+    snake = module.Snake(board=Board(width, height))
+    board = snake.board
+    board.clear()
+    cells = list(serpentine(width, height))
+    snake.positions = deque(reversed(cells[:length + 1]))
+    for position in snake.positions:
+        board.occupy(board.index(position))
+    # Делаем один честный шаг, чтобы у змейки появился затираемый хвост
+    head_x, head_y = snake.positions[0]
+    next_x, next_y = cells[length + 1]
+    snake.direction = (next_x - head_x, next_y - head_y)
+    snake.move()
+    return snake
+
+
+def timer(func, number=BENCH_NUMBER):
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        func()
+    return (time.perf_counter_ns() - start) / number
+
+
+def measure(name, prepare, number=BENCH_NUMBER):
+    """Лучшее среди повторов время одного вызова в наносекундах.
+
+    prepare() перед каждым повтором возвращает замеряемую функцию, чтобы
+    все повторы начинались с одинакового состояния. Медленные операции
+    можно замерять меньшим числом вызовов number.
+    """
+    best = min(timer(prepare(), number) for _ in range(BENCH_REPEATS))
+    calibration = min(timer(calibration_loop) for _ in range(BENCH_REPEATS))
+    results[name] = best
+    calibrations[name] = calibration
+    expected = baseline.get('results', {}).get(name)
+    if expected is not None:
+        ratio = best / calibration
+        expected_ratio = expected / baseline['calibration'][name]
+        assert ratio <= expected_ratio * (1 + BENCH_TOLERANCE), (
+            f'Замер `{name}` стал медленнее: {best:.0f} нс против '
+            f'{expected:.0f} нс в базовом файле (с поправкой на скорость '
+            f'машины в {ratio / expected_ratio:.2f} раза).'
+        )
+
+
+BENCH_CASES = [
+    (width, height, length)
+    for width, height in BENCH_BOARDS
+    for length in BENCH_LENGTHS
+]
+BENCH_IDS = [f'{width}x{height}-{length}'
+             for width, height, length in BENCH_CASES]
+
+
+@pytest.mark.parametrize('width, height, length', BENCH_CASES, ids=BENCH_IDS)
+def test_bench_move(_the_snake, width, height, length):
+    def prepare():
+        snake = make_snake(_the_snake, width, height, length)
+        snake.direction = RIGHT
+        return snake.move
+
+    measure(f'move[{width}x{height}-{length}]', prepare)
+
+
+@pytest.mark.parametrize('width, height, length', BENCH_CASES, ids=BENCH_IDS)
+def test_bench_collision(_the_snake, width, height, length):
+    snake = make_snake(_the_snake, width, height, length)
+    measure(f'collision[{width}x{height}-{length}]',
+            lambda: snake.check_collision)
+
+
+@pytest.mark.parametrize('width, height, length', BENCH_CASES, ids=BENCH_IDS)
+def test_bench_apple(_the_snake, width, height, length):
+    snake = make_snake(_the_snake, width, height, length)
+    apple = _the_snake.Apple()
+    apple.width, apple.height = width, height
+
+    def place_apple():
+        apple.randomize_position(snake.board.free_cells)
+
+    measure(f'apple[{width}x{height}-{length}]', lambda: place_apple)
+
+
+@pytest.mark.parametrize('width, height, length', BENCH_CASES, ids=BENCH_IDS)
+def test_bench_snake_draw(_the_snake, monkeypatch, width, height, length):
+    # Камера видит только окно, остальной мир отсекается
+    monkeypatch.setattr(_the_snake, 'camera',
+                        _the_snake.Camera(width, height))
+    snake = make_snake(_the_snake, width, height, length)
+    measure(f'snake_draw[{width}x{height}-{length}]', lambda: snake.draw)
+
+
+@pytest.mark.parametrize('width, height, length', BENCH_CASES, ids=BENCH_IDS)
+def test_bench_autopilot(_the_snake, width, height, length):
+    snake = make_snake(_the_snake, width, height, length)
+    apple = AppleModel(width, height, Random(0))
+    apple.randomize_position(snake.board.free_cells)
+    # Полный поиск пути, без запомненного с прошлого шага
+    autopilot = Autopilot(snake, apple)
+    measure(f'autopilot[{width}x{height}-{length}]', lambda: autopilot.plan,
+            BENCH_AUTOPILOT_NUMBER)
+
+
+def test_bench_info_board(_the_snake):
+    info_board = _the_snake.InfoBoard()
+    score = iter(range(10 ** 9))
+
+    def draw_score():
+        info_board.set_score_and_speed(next(score), 42)
+
+    measure('info_board', lambda: draw_score)
@@ -0,0 +1,41 @@
+import pygame
+
+from snake_capture import CAPTURE_RAW, FrameCapture
+from snake_engine import RIGHT, UP
+from snake_replay import Replay
+
+
+def test_dropped_frames_reach_the_next_saved_frame(tmp_path):
+    surface = pygame.Surface((40, 30))
+    surface.fill((10, 20, 30))
+    capture = FrameCapture(surface.get_size(), tmp_path, buffers=1)
+    assert capture.add(surface)
+    # Поток записи еще не запущен, единственный буфер занят
+    surface.fill((200, 0, 0), (0, 0, 10, 10))
+    assert not capture.add(surface, [pygame.Rect(0, 0, 10, 10)])
+    capture.start()
+    surface.fill((0, 200, 0), (30, 20, 10, 10))
+    while not capture.add(surface, [pygame.Rect(30, 20, 10, 10)]):
+        pass
+    capture.close()
+    assert capture.saved == 2
+    assert capture.dropped >= 1
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names[0] == 'frame_000001.png'
+    last = pygame.image.load(tmp_path / names[-1])
+    assert (pygame.image.tobytes(last, 'RGB')
+            == pygame.image.tobytes(surface, 'RGB'))
+
+
+def test_render_replay_to_raw_stream(_the_snake, tmp_path):
+    pygame.init()
+    replay = Replay(7, _the_snake.WORLD_WIDTH, _the_snake.WORLD_HEIGHT, 30,
+                    [(5, UP), (9, RIGHT)])
+    size = _the_snake.screen.get_size()
+    path = tmp_path / 'game.raw'
+    capture = FrameCapture(size, path, CAPTURE_RAW).start()
+    _the_snake.render_replay(replay, capture)
+    capture.close()
+    # Без окна кадры не пропускаются: по кадру на каждый тик
+    assert capture.saved == capture.frames == 30
+    assert path.stat().st_size == 30 * size[0] * size[1] * 4
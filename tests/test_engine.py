@@ -0,0 +1,166 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BASE_DIR
+from snake_engine import (DOWN, EVENT_APPLE, EVENT_BOARD_FULL,
+                          EVENT_COLLISION, LEFT, RIGHT, SPEED_COEFFICIENT,
+                          SNAPSHOT_HEADER, SPEED_START, UP, Board,
+                          GameEngine, SnakeModel)
+
+
+def test_engine_does_not_import_pygame():
+    code = 'import sys, snake_engine; print("pygame" in sys.modules)'
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == 'False', (
+        'Модуль `snake_engine` не должен импортировать pygame.'
+    )
+
+
+def test_move_wraps_around_board():
+    snake = SnakeModel(Board(4, 3))
+    snake.move()
+    snake.move()
+    assert snake.get_head_position() == (0, 1)
+    snake.direction = UP
+    snake.move()
+    snake.move()
+    assert snake.get_head_position() == (0, 2)
+
+
+def test_free_cells_follow_occupancy():
+    engine = GameEngine()
+    board = engine.snake.board
+    for action in (None, DOWN, LEFT, LEFT, UP) * 20:
+        engine.step(action)
+        if engine.game_over:
+            engine.reset()
+        free = set(board.free_cells.cells[:len(board.free_cells)])
+        expected = {
+            cell for cell in range(len(board.occupied))
+            if not board.occupied[cell]
+        }
+        assert free == expected
+
+
+def test_step_eats_apple_and_speeds_up():
+    engine = GameEngine()
+    head_x, head_y = engine.snake.get_head_position()
+    engine.apple.position = (head_x + 1, head_y)
+    state, events = engine.step()
+    assert events == (EVENT_APPLE,)
+    assert state.score == 1
+    assert state.length == 2
+    assert state.speed == SPEED_START * (1 + SPEED_COEFFICIENT / 100)
+
+
+def test_step_reports_collision():
+    engine = GameEngine()
+    snake = engine.snake
+    for _ in range(4):
+        head_x, head_y = snake.get_head_position()
+        engine.apple.position = (head_x + 1, head_y)
+        engine.step()
+    engine.apple.position = (0, 0)
+    events = ()
+    for action in (DOWN, LEFT, UP):
+        _, events = engine.step(action)
+    assert events == (EVENT_COLLISION,)
+    assert engine.game_over
+
+
+def test_turn_ignores_reverse_direction():
+    snake = SnakeModel()
+    snake.turn(LEFT)
+    assert snake.next_direction is None
+    snake.turn(UP)
+    assert snake.next_direction == UP
+
+
+@pytest.mark.parametrize('width, height', ((2, 1), (3, 1)))
+def test_full_board_ends_game(width, height):
+    engine = GameEngine(SnakeModel(Board(width, height)))
+    events = ()
+    while not engine.game_over:
+        engine.apple.position = engine.snake.board.position(
+            engine.snake.board.free_cells.choice(engine.apple.rng))
+        _, events = engine.step(RIGHT)
+    assert EVENT_BOARD_FULL in events
+
+
+def test_snapshot_restore_replays_same_game():
+    engine = GameEngine(SnakeModel(Board(8, 6)), seed=3)
+    actions = [UP, LEFT, None, DOWN, RIGHT, None, None, UP] * 8
+    for action in actions[:20]:
+        engine.step(action)
+        if engine.game_over:
+            break
+    engine.snake.turn(DOWN)
+    snapshot = engine.snapshot()
+    length = engine.snake.length
+
+    def play():
+        steps = []
+        for action in actions[20:]:
+            steps.append(engine.step(action))
+            if engine.game_over:
+                break
+        return steps, list(engine.snake.positions), bytes(
+            engine.snake.board.occupied)
+
+    expected = play()
+    engine.restore(snapshot)
+    assert engine.snake.next_direction == DOWN
+    assert play() == expected
+    # К снимку можно вернуться сколько угодно раз
+    engine.restore(snapshot)
+    assert play() == expected
+    # Поле не копируется: снимок - заголовок и тело змейки
+    assert len(snapshot.data) == (
+        SNAPSHOT_HEADER.size + length * 3)
+    with pytest.raises(ValueError):
+        GameEngine(SnakeModel(Board(8, 6)), seed=4).restore(snapshot)
+
+
+def test_restore_rejects_abandoned_branch():
+    engine = GameEngine(SnakeModel(Board(8, 6)), seed=3)
+    root = engine.snapshot()
+    engine.step(DOWN)
+    branch = engine.snapshot()
+    occupied = bytes(engine.snake.board.occupied)
+    engine.step(None)
+    engine.restore(branch)
+    assert bytes(engine.snake.board.occupied) == occupied
+    engine.restore(root)
+    # Ветка после root отменена, вернуться в неё нельзя
+    with pytest.raises(ValueError):
+        engine.restore(branch)
+    engine.forget_snapshots()
+    assert engine.snake.board.journal is None
+    with pytest.raises(ValueError):
+        engine.restore(root)
+
+
+def test_reset_restores_fresh_board_without_rebuilding():
+    engine = GameEngine(SnakeModel(Board(64, 48)), seed=1)
+    board = engine.snake.board
+    free_cells = board.free_cells
+    for seed in range(3):
+        for action in [UP, LEFT, None, DOWN, RIGHT] * 30:
+            engine.step(action)
+            if engine.game_over:
+                break
+        engine.reset(seed)
+        # Набор тот же, переставлены назад только затронутые места
+        assert board.free_cells is free_cells
+        assert len(free_cells.touched) == 2
+        fresh = GameEngine(SnakeModel(Board(64, 48)), seed=seed)
+        fresh_board = fresh.snake.board
+        assert board.occupied == fresh_board.occupied
+        assert free_cells.cells == fresh_board.free_cells.cells
+        assert free_cells.slots == fresh_board.free_cells.slots
+        assert engine.apple.position == fresh.apple.position
@@ -0,0 +1,103 @@
+import logging
+
+import pygame
+import pytest
+
+from snake_engine import Board, GameEngine
+from snake_replay import ReplayFile, ReplayRecorder, ReplayWriter
+
+
+@pytest.fixture
+def game_loop(_the_snake, tmp_path):
+    pygame.init()
+    game = GameEngine(_the_snake.Snake(board=Board()), _the_snake.Apple())
+    return _the_snake.GameLoop(game, _the_snake.InfoBoard(),
+                               ReplayRecorder(game),
+                               ReplayWriter(tmp_path / 'replays.snr'))
+
+
+def test_finished_game_is_saved_once(game_loop, tmp_path):
+    game_loop.game.step()
+    game_loop.game_over()
+    # Окно закрыли на экране конца игры
+    game_loop.finish()
+    with ReplayFile(tmp_path / 'replays.snr') as replays:
+        assert len(replays) == 1
+    game_loop.restart()
+    game_loop.game.step()
+    game_loop.finish()
+    with ReplayFile(tmp_path / 'replays.snr') as replays:
+        assert len(replays) == 2
+
+
+def test_key_burst_turns_once_per_step(game_loop, _the_snake):
+    game_loop.game.apple.position = (0, 0)
+    pygame.event.clear()
+    for key in (pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN, pygame.K_x,
+                pygame.K_RIGHT, pygame.K_UP):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+    _the_snake.handle_keys(game_loop.snake, game_loop.key_queue,
+                           game_loop.pressed_keys)
+    # Лишние повороты отбрасываются, первые нажатия сохраняются
+    assert list(game_loop.key_queue) == [
+        pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN]
+    assert game_loop.pressed_keys == [pygame.K_x]
+    step_time = 1 / game_loop.snake.speed
+    game_loop.accumulator = 2.5 * step_time
+    game_loop.update()
+    assert game_loop.game.ticks == 2
+    assert game_loop.snake.direction == _the_snake.LEFT
+    assert game_loop.accumulator == pytest.approx(0.5 * step_time)
+    # Отставание больше MAX_STEPS_PER_FRAME шагов не догоняется
+    game_loop.accumulator = 100 * step_time
+    game_loop.update()
+    assert game_loop.game.ticks == 2 + _the_snake.MAX_STEPS_PER_FRAME
+    assert game_loop.snake.direction == _the_snake.DOWN
+    assert game_loop.accumulator == 0.0
+    assert not game_loop.key_queue
+
+
+def test_autopilot_toggle_drops_queued_turns(game_loop, _the_snake):
+    game_loop.key_queue.append(pygame.K_UP)
+    game_loop.pressed_keys.append(_the_snake.AUTOPILOT_KEY)
+    assert not game_loop.control_keys()
+    assert game_loop.autopilot is not None
+    assert not game_loop.key_queue
+    game_loop.key_queue.append(pygame.K_DOWN)
+    game_loop.next_turn()
+    game_loop.toggle_autopilot()
+    assert game_loop.autopilot is None
+    assert game_loop.next_turn() is None
+
+
+def post_key(key):
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+
+def test_pause_game_over_and_restart(game_loop, _the_snake, caplog):
+    caplog.set_level(logging.INFO, logger=_the_snake.logger.name)
+    pygame.event.clear()
+    post_key(_the_snake.PAUSE_KEY)
+    game_loop.play_frame()
+    assert game_loop.state == _the_snake.STATE_PAUSED
+    post_key(_the_snake.PAUSE_KEY)
+    game_loop.wait_for_key(_the_snake.PAUSE_KEY)
+    game_loop.resume()
+    assert game_loop.state == _the_snake.STATE_PLAYING
+    assert game_loop.accumulator == 0.0
+    assert game_loop.idle_counter.waits == 1
+    assert 'Ожидание событий: 1 раз' in caplog.text
+    # Змейка врезается в занятую ячейку прямо перед собой
+    snake = game_loop.snake
+    head_x, head_y = snake.get_head_position()
+    board = snake.board
+    board.occupy(board.index(((head_x + 1) % board.width, head_y)))
+    game_loop.step([])
+    assert game_loop.state == _the_snake.STATE_GAME_OVER
+    post_key(pygame.K_SPACE)
+    game_loop.wait_for_key(pygame.K_SPACE)
+    game_loop.restart()
+    assert game_loop.state == _the_snake.STATE_PLAYING
+    assert game_loop.game.ticks == 0
+    assert not game_loop.game.game_over
+    assert game_loop.idle_counter.report()['waits'] == 2
@@ -0,0 +1,102 @@
+import pygame
+import pytest
+
+from snake_engine import (EVENT_COLLISION, UP, AppleModel, Board,
+                          GameEngine, SnakeModel)
+from snake_levels import Level
+
+# Поле 6x4: стена в столбце 3, змейка начинает левее неё
+LEVEL_TEXT = (
+    '...#..\n'
+    '.S.#..\n'
+    '...#..\n'
+    '......\n'
+)
+
+
+def make_engine(level):
+    board = Board(level.width, level.height, level)
+    snake = SnakeModel(board)
+    apple = AppleModel(level.width, level.height)
+    return GameEngine(snake, apple, seed=1)
+
+
+def test_level_file_round_trip(tmp_path):
+    level = Level.from_text(LEVEL_TEXT)
+    path = tmp_path / 'level.snkl'
+    level.save(path)
+    loaded = Level.load(path)
+    assert (loaded.width, loaded.height) == (6, 4)
+    assert loaded.start == (1, 1)
+    assert bytes(loaded.walls) == bytes(level.walls)
+    assert bytes(loaded.free) == bytes(level.free)
+    assert bytes(loaded.slots) == bytes(level.slots)
+    assert [loaded.is_wall(cell) for cell in (3, 9, 21)] == [
+        True, True, False]
+
+
+def test_walls_are_occupied_and_never_free():
+    level = Level.from_text(LEVEL_TEXT)
+    engine = make_engine(level)
+    board = engine.snake.board
+    walls = {cell for cell in range(24) if level.is_wall(cell)}
+    assert walls == {3, 9, 15}
+    assert all(board.occupied[cell] for cell in walls)
+    free = set(board.free_cells.cells[:len(board.free_cells)])
+    assert not free & walls
+    assert engine.snake.get_head_position() == (1, 1)
+    for _ in range(200):
+        engine.apple.randomize_position(board.free_cells)
+        assert board.index(engine.apple.position) not in walls
+
+
+def test_wall_collision_ends_game_and_wall_survives_reset():
+    level = Level.from_text(LEVEL_TEXT)
+    engine = make_engine(level)
+    board = engine.snake.board
+    engine.apple.position = (0, 3)
+    assert not engine.step()[1]
+    assert engine.step()[1] == (EVENT_COLLISION,)
+    assert engine.game_over
+    engine.reset()
+    assert board.occupied[9] == 1
+    assert 9 not in board.free_cells.cells[:len(board.free_cells)]
+    assert len(board.free_cells) == 24 - 3 - 1
+    engine.step(UP)
+    assert not engine.game_over
+
+
+def test_walls_are_painted_on_background(_the_snake, monkeypatch):
+    level = Level.from_text(LEVEL_TEXT)
+    monkeypatch.setattr(_the_snake, 'camera', _the_snake.Camera(6, 4))
+    _the_snake.paint_walls(level)
+    size = _the_snake.GRID_SIZE
+    wall = _the_snake.background.get_at((3 * size + size // 2, size // 2))
+    empty = _the_snake.background.get_at((size // 2, size // 2))
+    assert wall[:3] == _the_snake.WALL_COLOR
+    assert empty[:3] == _the_snake.BOARD_BACKGROUND_COLOR
+    _the_snake.paint_walls(None)
+    assert _the_snake.background.get_at(
+        (3 * size + size // 2, size // 2)) == empty
+    assert isinstance(_the_snake.background, pygame.Surface)
+
+
+def test_games_on_level_are_not_recorded(_the_snake, monkeypatch, tmp_path):
+    rows = ['.' * _the_snake.WORLD_WIDTH] * _the_snake.WORLD_HEIGHT
+    rows[0] = '#' * _the_snake.WORLD_WIDTH
+    Level.from_text('\n'.join(rows)).save(tmp_path / 'level.snkl')
+    monkeypatch.setattr(_the_snake, 'LEVEL_FILE', tmp_path / 'level.snkl')
+    monkeypatch.setattr(_the_snake, 'REPLAY_FILE', tmp_path / 'replays.snr')
+    monkeypatch.setattr(_the_snake, 'RESULTS_FILE', tmp_path / 'results.snks')
+
+    def close_window(game_loop):
+        game_loop.step([])
+        raise SystemExit
+
+    # Окно закрывают после первого шага игры
+    monkeypatch.setattr(_the_snake.GameLoop, 'run', close_window)
+    with pytest.raises(SystemExit):
+        _the_snake.main()
+    # Повтор без стен разошелся бы с игрой, поэтому записи нет
+    assert not (tmp_path / 'replays.snr').exists()
+    _the_snake.paint_walls(None)
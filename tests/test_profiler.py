@@ -0,0 +1,69 @@
+import csv
+import json
+
+import pygame
+
+from snake_engine import Board, GameEngine
+from snake_profiler import MEMORY_BLOCKS, FrameProfiler
+from snake_replay import ReplayRecorder, ReplayWriter
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def bump(self):
+        self.calls += 1
+
+
+def test_profiler_collects_phases_and_exports(tmp_path):
+    counter = Counter()
+    profiler = FrameProfiler(window=50)
+    profiler.enable(('frame',), ((counter, 'bump', 'bump'),))
+    for _ in range(60):
+        profiler.start_frame()
+        profiler.timed('frame', counter.bump)
+        profiler.end_frame()
+    profiler.disable()
+    # Обертка снята, метод снова берется из класса
+    assert 'bump' not in vars(counter)
+    assert counter.calls == 60
+    summary = profiler.summary()
+    assert list(summary) == ['frame', 'bump', MEMORY_BLOCKS, 'alloc_peak']
+    assert 0 < summary['frame']['p50'] <= summary['frame']['p99']
+
+    profiler.export_json(tmp_path / 'profile.json')
+    report = json.loads((tmp_path / 'profile.json').read_text())
+    assert report['frames'] == 60
+    assert report['window'] == 50
+    assert sum(report['histograms']['bump'].values()) == 50
+
+    profiler.export_csv(tmp_path / 'profile.csv')
+    with open(tmp_path / 'profile.csv', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['frame'] + profiler.phases
+    assert [row[0] for row in rows[1:]] == [str(n) for n in range(10, 60)]
+
+
+def test_game_loop_toggles_profiler(_the_snake, tmp_path):
+    pygame.init()
+    snake = _the_snake.Snake(board=Board())
+    game = GameEngine(snake, _the_snake.Apple())
+    loop = _the_snake.GameLoop(game, _the_snake.InfoBoard(),
+                               ReplayRecorder(game),
+                               ReplayWriter(tmp_path / 'replays.snr'))
+    loop.pressed_keys.append(_the_snake.PROFILER_KEY)
+    loop.play_frame()
+    assert loop.profiler.enabled
+    for _ in range(10):
+        loop.play_frame()
+    assert loop.profiler.frames == 10
+    assert loop.info_board.profile_lines
+    loop.pressed_keys.append(_the_snake.PROFILER_KEY)
+    loop.play_frame()
+    assert not loop.profiler.enabled
+    assert loop.info_board.profile_lines is None
+    # После выключения не остается ни одной обертки
+    assert 'play_frame' not in vars(loop)
+    assert 'move' not in vars(snake)
+    assert 'draw' not in vars(game.apple)
@@ -0,0 +1,113 @@
+import pygame
+import pytest
+
+from snake_engine import Board
+
+
+@pytest.fixture
+def big_camera(_the_snake, monkeypatch):
+    camera = _the_snake.Camera(100, 80, width=10, height=8, margin=2)
+    monkeypatch.setattr(_the_snake, 'camera', camera)
+    return camera
+
+
+def test_camera_culls_cells_outside_view(big_camera, _the_snake):
+    size = _the_snake.GRID_SIZE
+    assert big_camera.to_screen((3, 4)) == (3 * size, 4 * size)
+    assert big_camera.to_screen((10, 0)) is None
+    big_camera.x = 95
+    assert big_camera.to_screen((1, 0)) == (6 * size, 0)
+
+
+def test_camera_follows_head_near_edge(big_camera):
+    assert not big_camera.follow((5, 4))
+    assert big_camera.follow((8, 4))
+    assert (big_camera.x, big_camera.y) == (3, 0)
+
+
+def test_camera_is_fixed_when_world_fits_window(_the_snake):
+    camera = _the_snake.Camera()
+    assert not camera.follow((0, 0))
+    assert (camera.x, camera.y) == (0, 0)
+
+
+def test_redraw_matches_incremental_drawing(big_camera, _the_snake):
+    pygame.init()
+    snake = _the_snake.Snake(board=Board(100, 80))
+    big_camera.center_on(snake.get_head_position())
+    snake.draw()
+    for direction in (_the_snake.RIGHT, _the_snake.UP, _the_snake.LEFT):
+        for _ in range(3):
+            snake.turn(direction)
+            snake.update_direction()
+            snake.move()
+            snake.grow()
+            snake.draw()
+    screen = _the_snake.screen
+    incremental = pygame.image.tostring(screen, 'RGB')
+    snake.clear_screan()
+    snake.draw_visible()
+    assert pygame.image.tostring(screen, 'RGB') == incremental
+
+
+def test_sprites_across_wall_and_full_repaint(big_camera, _the_snake):
+    pygame.init()
+    board = Board(100, 80)
+    snake = _the_snake.Snake(board=board)
+    snake.reset((1, 5))
+    snake.draw()
+    for direction in (_the_snake.UP,) * 2 + (_the_snake.LEFT,) * 4:
+        snake.turn(direction)
+        snake.update_direction()
+        snake.move()
+        snake.grow()
+        snake.draw()
+    codes = _the_snake.SPRITE_CODES
+    sprites = snake.cell_sprites
+    assert snake.get_head_position() == (97, 3)
+    # Элементы по обе стороны края поля - прямое горизонтальное тело
+    for position in ((98, 3), (99, 3), (0, 3)):
+        assert sprites[board.index(position)] == codes['body', 90]
+    assert sprites[board.index((1, 5))] == codes['tail', 180]
+    incremental = bytes(sprites)
+    snake.paint_body()
+    assert bytes(snake.cell_sprites) == incremental
+
+
+def test_cleared_cells_are_restored_from_background(_the_snake, monkeypatch):
+    pygame.init()
+    background = _the_snake.build_background(grid=True)
+    monkeypatch.setattr(_the_snake, 'background', background)
+    size = _the_snake.GRID_SIZE
+    # Рамка ячейки нарисована на фоне один раз
+    assert background.get_at((0, 0))[:3] == _the_snake.BORDER_COLOR
+    assert background.get_at((size // 2, size // 2))[:3] == (
+        _the_snake.BOARD_BACKGROUND_COLOR)
+    snake = _the_snake.Snake()
+    snake.draw()
+    snake.move()
+    snake.draw()
+    rect = pygame.Rect(_the_snake.camera.to_screen(snake.last), (size, size))
+    screen = _the_snake.screen
+    assert (pygame.image.tobytes(screen.subsurface(rect), 'RGB')
+            == pygame.image.tobytes(background.subsurface(rect), 'RGB'))
+
+
+def test_sprites_after_ring_wraps_without_growth(big_camera, _the_snake):
+    pygame.init()
+    snake = _the_snake.Snake(board=Board(100, 80))
+    snake.reset((5, 1))
+    snake.direction = _the_snake.DOWN
+    for _ in range(2):
+        snake.move()
+        snake.grow()
+    assert len(snake.codes) == len(snake.cells)
+    codes = _the_snake.SPRITE_CODES
+    # Голова проходит по кольцевому буферу больше одного круга
+    for _ in range(2 * len(snake.cells) + 1):
+        snake.move()
+        snake.draw()
+        assert snake.cell_sprites[snake.cell(1)] == codes['body', 0]
+        assert snake.cell_sprites[snake.cell(-1)] == codes['tail', 0]
+    assert snake.unwrap(snake.codes) == bytes(
+        (snake.code(-1), snake.code(1), snake.code(0)))
@@ -0,0 +1,55 @@
+import random
+
+from snake_engine import DIRECTIONS, GameEngine
+from snake_replay import (ReplayFile, ReplayRecorder, ReplayWriter,
+                          decode_replay, fast_forward, read_varint,
+                          write_varint)
+
+
+def play_random_game(engine, recorder, moves):
+    recorder.start()
+    while not engine.game_over and engine.ticks < 3000:
+        state, _ = engine.step(moves.choice(DIRECTIONS)
+                               if moves.random() < 0.3 else None)
+        recorder.record(state)
+    return engine.state()
+
+
+def test_varint_round_trip():
+    buffer = bytearray()
+    values = (0, 1, 127, 128, 300, 2 ** 40)
+    for value in values:
+        write_varint(buffer, value)
+    offset = 0
+    for value in values:
+        decoded, offset = read_varint(buffer, offset)
+        assert decoded == value
+    assert offset == len(buffer)
+
+
+def test_replays_reproduce_games(tmp_path):
+    path = tmp_path / 'games.snr'
+    writer = ReplayWriter(path)
+    engine = GameEngine()
+    recorder = ReplayRecorder(engine)
+    moves = random.Random(1)
+    results = []
+    for _ in range(5):
+        results.append(play_random_game(engine, recorder, moves))
+        writer.write(recorder.finish())
+        engine.reset()
+
+    with ReplayFile(path) as replays:
+        assert len(replays) == len(results)
+        for number, expected in enumerate(results):
+            assert fast_forward(replays[number]) == expected
+
+
+def test_replay_is_compact():
+    engine = GameEngine(seed=7)
+    recorder = ReplayRecorder(engine)
+    play_random_game(engine, recorder, random.Random(2))
+    record = recorder.finish()
+    replay = decode_replay(record)
+    assert replay.seed == 7
+    assert len(record) < 16 + 3 * len(replay.turns)
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from snake_engine import DOWN, LEFT, NO_CELL, UP, GameEngine
+from snake_results import (GameRecord, ResultLog, count_histogram,
+                           count_percentile, game_record, high_scores,
+                           read_blocks, value_counts)
+from snake_tournament import Tournament
+
+
+def make_record(score):
+    return GameRecord(score, score * 10, 10.5, score + 1, NO_CELL, 1.25,
+                      2 ** 64 - 1 - score)
+
+
+def test_log_writes_blocks_and_streams_aggregates(tmp_path):
+    path = tmp_path / 'results.snks'
+    log = ResultLog(path, block_size=3)
+    log.extend(make_record(score) for score in range(7))
+    log.close()
+    # Недописанный блок в конце файла пропускается
+    with open(path, 'ab') as file:
+        file.write(b'\x05\x00\x00\x00\x01\x02')
+    blocks = list(read_blocks(path, ('score',)))
+    assert [list(block) for block in blocks] == [['score']] * 3
+    assert [len(block['score']) for block in blocks] == [3, 3, 1]
+    counts = value_counts(path, 'score')
+    assert sum(counts.values()) == 7
+    assert count_percentile(counts, 50) == 3
+    assert count_percentile(counts, 100) == 6
+    assert [number for _, _, number in count_histogram(counts, 2)] == [3, 4]
+    assert value_counts(path, 'speed') == {10.5: 7}
+    # У зерен все значения разные, сводка по ним не считается
+    with pytest.raises(ValueError):
+        value_counts(path, 'seed')
+    best = high_scores(path, 2)
+    assert best == [make_record(6), make_record(5)]
+
+
+def test_log_flushes_idle_block_without_close(tmp_path):
+    path = tmp_path / 'results.snks'
+    log = ResultLog(path, flush_interval=0.01)
+    log.add(make_record(1))
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert value_counts(path, 'score') == {1: 1}
+    log.close()
+
+
+def test_game_record_reports_death_cell():
+    engine = GameEngine()
+    snake = engine.snake
+    for _ in range(4):
+        head_x, head_y = snake.get_head_position()
+        engine.apple.position = (head_x + 1, head_y)
+        engine.step()
+    engine.apple.position = (0, 0)
+    for action in (DOWN, LEFT, UP):
+        engine.step(action)
+    record = game_record(engine, 0.5)
+    assert engine.game_over
+    assert record.death_cell == snake.head_cell()
+    assert (record.score, record.ticks, record.length) == (4, 7, 5)
+
+
+def test_tournament_feeds_log(tmp_path):
+    log = ResultLog(tmp_path / 'results.snks')
+    tournament = Tournament(tmp_path / 'results.csv', 6, ('greedy',),
+                            max_ticks=500, chunk=3, log=log)
+    results = [result for chunk in tournament.run(workers=1)
+               for result in chunk]
+    log.close()
+    records = high_scores(tmp_path / 'results.snks', 6)
+    assert sorted(record.seed for record in records) == sorted(
+        result.seed for result in results)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+from random import Random
+
+import snake_server
+from snake_engine import FreeCells
+from snake_server import (FRAME_DELTA, FRAME_HEADER, NO_CELL, GameServer,
+                          LoadClient, Room, decode_delta)
+
+
+def apply_delta(bodies, apples, payload):
+    """Клиентская копия комнаты, которая знает только дельты."""
+    _, _, moves, deaths, spawns, new_apples = decode_delta(payload)
+    for snake_id, cell in spawns:
+        bodies[snake_id] = deque([cell])
+    for snake_id, head, tail in moves:
+        body = bodies[snake_id]
+        body.appendleft(head)
+        if tail != NO_CELL:
+            assert body.pop() == tail
+    for snake_id in deaths:
+        del bodies[snake_id]
+    for number, cell in new_apples:
+        apples[number] = cell
+
+
+def test_deltas_rebuild_room_state():
+    room = Room(24, 16, apples=8, seed=1)
+    rng = Random(2)
+    players = [room.join() for _ in range(12)]
+    bodies = {}
+    apples = [room.board.index(apple.position) for apple in room.apples]
+    for tick in range(300):
+        for snake_id in players:
+            if rng.random() < 0.3:
+                room.turn(snake_id, rng.randrange(4))
+        if tick == 150:
+            room.leave(players.pop())
+        payload = room.step()[FRAME_HEADER.size:]
+        assert payload[0] == FRAME_DELTA
+        apply_delta(bodies, apples, payload)
+        expected = {
+            snake_id: [room.board.index(position)
+                       for position in snake.positions]
+            for snake_id, snake in room.snakes.items()
+        }
+        assert {snake_id: list(body)
+                for snake_id, body in bodies.items()} == expected
+        assert apples == [room.board.index(apple.position)
+                          for apple in room.apples]
+    occupied = sum(len(snake.positions) for snake in room.snakes.values())
+    assert sum(room.board.occupied) == occupied
+    assert len(room.board.free_cells) == (
+        len(room.board.occupied) - sum(map(bool, room.board.occupied))
+    )
+
+
+def test_load_clients_receive_ticks():
+    async def scenario():
+        game_server = GameServer(Room(32, 24, seed=3), tick_rate=100)
+        server = await asyncio.start_server(game_server.handle_client,
+                                            '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        ticks = asyncio.create_task(game_server.tick_loop())
+        deadline = time.monotonic() + 0.5
+        clients = [LoadClient(Random(number)) for number in range(5)]
+        await asyncio.gather(*(client.run('127.0.0.1', port, deadline)
+                               for client in clients))
+        ticks.cancel()
+        server.close()
+        await server.wait_closed()
+        return clients
+
+    clients = asyncio.run(scenario())
+    for client in clients:
+        # Снимок при подключении и дельты тиков
+        assert client.frames > 10
+        assert len(client.latencies) == client.frames - 1
+
+
+def test_apples_and_spawns_do_not_share_cells(monkeypatch):
+    room = Room(8, 6, apples=2, seed=1)
+    first = room.board.index(room.apples[0].position)
+    other = (first + 1) % len(room.board.occupied)
+    # Генератор сначала выпадает на ячейку первого яблока
+    cells = iter([first, first, other, first, other + 1])
+    monkeypatch.setattr(FreeCells, 'choice', lambda self, rng: next(cells))
+    del room.apple_cells[room.board.index(room.apples[1].position)]
+    assert room.place_apple(1)
+    assert room.board.index(room.apples[1].position) == other
+    assert room.apple_cells == {first: 0, other: 1}
+    # Змейка тоже не появляется на яблоке
+    room.join()
+    assert room.spawn_waiting() == [(0, other + 1)]
+
+
+def test_tick_times_are_bounded(monkeypatch):
+    monkeypatch.setattr(snake_server, 'TICK_HISTORY', 10)
+
+    async def scenario():
+        game_server = GameServer(Room(16, 12, apples=2, seed=4),
+                                 tick_rate=10000)
+        ticks = asyncio.create_task(game_server.tick_loop())
+        await asyncio.sleep(0.3)
+        ticks.cancel()
+        return game_server
+
+    game_server = asyncio.run(scenario())
+    assert game_server.room.tick > 50
+    assert len(game_server.tick_times) == 10
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import threading
+
+import pygame
+
+from conftest import BASE_DIR
+from snake_assets import AssetManager
+
+
+def test_import_does_not_open_window():
+    code = ('import pygame, the_snake; '
+            'print(pygame.display.get_init(), '
+            'isinstance(the_snake.screen, pygame.Surface))')
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        env={'SDL_VIDEODRIVER': 'dummy', 'PATH': ''},
+    )
+    assert result.stdout.split()[-2:] == ['False', 'True']
+
+
+def test_window_keeps_frame_drawn_before_it_opened(_the_snake):
+    # Окно могли открыть другие тесты, начинаем без него
+    pygame.display.quit()
+    _the_snake.screen = pygame.Surface(
+        (_the_snake.BOARD_WIDTH,
+         _the_snake.BOARD_HEIGHT + _the_snake.INFO_BOARD_HEIGHT), 0, 32)
+    pygame.font.init()
+    _the_snake.preload_assets()
+    info_board = _the_snake.InfoBoard()
+    info_board.set_score_and_speed(12, 34)
+    frame = pygame.image.tobytes(_the_snake.screen, 'RGB')
+    _the_snake.open_window()
+    assert _the_snake.screen is pygame.display.get_surface()
+    assert pygame.image.tobytes(_the_snake.screen, 'RGB') == frame
+    # Повторный вызов не открывает окно заново
+    _the_snake.open_window()
+    assert _the_snake.screen is pygame.display.get_surface()
+
+
+def test_atlas_is_converted_when_window_opens(_the_snake, monkeypatch):
+    pygame.display.quit()
+    _the_snake.screen = pygame.Surface(
+        (_the_snake.BOARD_WIDTH,
+         _the_snake.BOARD_HEIGHT + _the_snake.INFO_BOARD_HEIGHT), 0, 32)
+    assets = AssetManager(angles=_the_snake.SPRITE_ANGLES,
+                          size=_the_snake.GRID_SIZE)
+    monkeypatch.setattr(_the_snake, 'assets', assets)
+    # Фоновая сборка атласа не обращается к окну
+    with monkeypatch.context() as patch:
+        patch.setattr(pygame.display, 'get_surface', None)
+        preload = threading.Thread(target=assets.load)
+        preload.start()
+        preload.join()
+    source = assets.source
+    _the_snake.open_window(preload)
+    assert assets.converted
+    assert assets.source is not source
+    assert assets.sprite('apple').get_parent() is assets.atlas
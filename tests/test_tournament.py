@@ -0,0 +1,50 @@
+import random
+
+from snake_engine import RIGHT, UP, Board, GameEngine, SnakeModel
+from snake_tournament import (AGENTS, CAUSE_TIMEOUT, Tournament, game_seed,
+                              play_game, read_results)
+
+
+def test_tournament_resumes_and_matches_serial_games(tmp_path):
+    path = tmp_path / 'results.csv'
+    tournament = Tournament(path, 12, seed=5, max_ticks=2000, chunk=4)
+    first = next(tournament.run(workers=2))
+    assert len(first) == 4
+    # Прерванная запись последней строки не мешает продолжению
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('99,1,gre')
+    assert len(tournament.pending()) == 8
+    for _ in tournament.run(workers=2):
+        pass
+    results = sorted(read_results(path))
+    assert [result.game for result in results] == list(range(12))
+    for result in results:
+        agent = list(AGENTS)[result.game % len(AGENTS)]
+        expected = play_game(result.game, game_seed(5, result.game), agent,
+                             max_ticks=2000)
+        assert result.agent == agent
+        assert (result.score, result.ticks, result.cause) == (
+            expected.score, expected.ticks, expected.cause)
+    assert not tournament.pending()
+
+
+def test_straight_agent_times_out():
+    result = play_game(0, 1, 'straight', max_ticks=500)
+    assert result.cause == CAUSE_TIMEOUT
+    assert result.ticks == 500
+
+
+def test_greedy_agent_follows_its_tail():
+    engine = GameEngine(SnakeModel(Board(6, 6)), seed=1)
+    snake = engine.snake
+    snake.remove()
+    # Змейка свернута в квадрат, хвост справа от головы
+    snake.positions = [(1, 1), (1, 2), (2, 2), (2, 1)]
+    for cell in snake.iter_cells():
+        snake.board.occupy(cell)
+    snake.direction = UP
+    engine.apple.position = (3, 1)
+    agent = AGENTS['greedy'](engine, random.Random(1))
+    assert agent(engine.state()) == RIGHT
+    engine.step(RIGHT)
+    assert not engine.game_over
@@ -1,14 +1,38 @@
-from random import randint
+import logging
+import os
+import threading
+import time
+from collections import deque
 
 import pygame
 
+from snake_assets import GRAPHICS_DIR, AssetManager
+from snake_autopilot import Autopilot
+from snake_capture import FrameCapture
+from snake_engine import (DIRECTIONS, DOWN, EVENT_APPLE, GRID_CENTER,
+                          GRID_HEIGHT, GRID_WIDTH, LEFT, RIGHT, SPEED_START,
+                          UP, AppleModel, Board, GameEngine, SnakeModel)
+from snake_levels import Level
+from snake_profiler import MEMORY_BLOCKS, MEMORY_PEAK, FrameProfiler
+from snake_replay import ReplayRecorder, ReplayWriter, playback
+from snake_results import ResultLog, game_record
+
 # Константы для размеров поля и сетки:
 SCREEN_WIDTH, SCREEN_HEIGHT = 640, 480  # заглушка чтобы не ругались тесты
-BOARD_WIDTH, BOARD_HEIGHT = 640, 480
-BOARD_CENTER = (BOARD_WIDTH // 2, BOARD_HEIGHT // 2)
 GRID_SIZE = 20
-GRID_WIDTH = BOARD_WIDTH // GRID_SIZE
-GRID_HEIGHT = BOARD_HEIGHT // GRID_SIZE
+BOARD_WIDTH, BOARD_HEIGHT = GRID_WIDTH * GRID_SIZE, GRID_HEIGHT * GRID_SIZE
+BOARD_CENTER = (BOARD_WIDTH // 2, BOARD_HEIGHT // 2)
+
+# Размер видимой части поля в ячейках - он совпадает с окном
+VIEW_WIDTH, VIEW_HEIGHT = GRID_WIDTH, GRID_HEIGHT
+
+# Размер всего игрового мира в ячейках, он может быть больше окна,
+# например 4096 x 4096 - тогда камера следует за головой змейки
+WORLD_WIDTH, WORLD_HEIGHT = GRID_WIDTH, GRID_HEIGHT
+
+# Насколько близко к краю окна голова может подойти, прежде чем
+# камера переместится
+CAMERA_MARGIN = 4
 
 # Константы для Экрана с информацией
 INFO_BOARD_HEIGHT = 100
@@ -21,18 +45,67 @@ INFO_BOARD_BORDER1_COLOR = (31, 66, 22)
 INFO_BOARD_BORDER2_COLOR = (53, 112, 38)
 INFO_BOARD_BORDER_SIZE = 5
 
-# Пути к файлам с картинками
-APPLE_IMG = 'Graphics/apple.png'
-SNAKE_BODY_IMG = 'Graphics/body.png'
-SNAKE_HEAD_IMG = 'Graphics/head.png'
-SNAKE_TAIL_IMG = 'Graphics/tail.png'
-SNAKE_TURN_IMG = 'Graphics/turn.png'
+# Готовый атлас спрайтов: если файла нет, атлас собирается из картинок
+# папки Graphics (собрать файл: python snake_assets.py Graphics/atlas.snka)
+ATLAS_FILE = os.path.join(GRAPHICS_DIR, 'atlas.snka')
+
+# Частота кадров и предел шагов симуляции за один кадр, после которого
+# отставание не догоняется, а сбрасывается
+FPS = 60
+MAX_STEPS_PER_FRAME = 5
+
+# Сколько нажатий клавиш поворота помнится до их обработки, следующие
+# нажатия отбрасываются
+INPUT_QUEUE_SIZE = 3
+
+# Состояния игрового цикла
+STATE_PLAYING = 'playing'
+STATE_PAUSED = 'paused'
+STATE_GAME_OVER = 'game_over'
+
+# Клавиша паузы
+PAUSE_KEY = pygame.K_p
+
+# Сколько миллисекунд ждать событие в паузе и после конца игры
+IDLE_WAIT_TIMEOUT = 500
+
+# Файл, куда дописываются записи сыгранных игр
+REPLAY_FILE = 'replays.snr'
+
+# Файл, куда дописываются результаты сыгранных игр
+RESULTS_FILE = 'results.snks'
+
+# Файл уровня со стенами того же размера, что и мир, None - поле без стен
+# (собрать файл: python snake_levels.py Levels/walls.txt Levels/walls.snkl)
+LEVEL_FILE = None
+
+# Клавиша, которая передает управление автопилоту и возвращает его
+AUTOPILOT_KEY = pygame.K_a
+
+# Клавиши включения замера фаз кадра и сохранения результатов замера
+PROFILER_KEY = pygame.K_F3
+PROFILER_EXPORT_KEY = pygame.K_F4
+
+# Файлы с результатами замера: перцентили и гистограммы, значения по кадрам
+PROFILE_JSON_FILE = 'profile.json'
+PROFILE_CSV_FILE = 'profile.csv'
+
+# Фазы кадра, которые замеряются в самом игровом цикле
+PROFILER_PHASES = ('tick', 'handle_keys', 'move', 'collision', 'apple',
+                   'apple_draw', 'snake_draw', 'redraw', 'info_board',
+                   'display_update')
 
-# Направления движения:
-UP = (0, -1,)
-LEFT = (-1, 0)
-DOWN = (0, 1,)
-RIGHT = (1, 0)
+# Как часто (в кадрах) обновляются результаты замера на экране
+PROFILER_OVERLAY_FRAMES = 30
+
+# Результаты замера выводятся мелким шрифтом справа от счёта
+PROFILER_FONT_SIZE = 16
+PROFILER_OVERLAY_X = 280
+PROFILER_OVERLAY_COLUMNS = 2
+
+# Клавиша включения записи кадров и папка, куда пишутся кадры PNG
+CAPTURE_KEY = pygame.K_F5
+CAPTURE_DIR = 'capture'
 
 # Правила поворота изображений
 IMG_TURN = {
@@ -64,6 +137,41 @@ SNAKE_BODY_TURN_RULES = {
     ((-1, 1), (0, -1)): 270,
 }
 
+# Углы, под которые заранее поворачиваются изображения змейки
+SPRITE_ANGLES = sorted(set(IMG_TURN.values())
+                       | set(SNAKE_BODY_TURN_RULES.values()))
+
+# Номера изображений змейки для хранения в ячейках поля, 0 - пустая ячейка
+SPRITE_KEYS = [None] + [
+    (kind, angle)
+    for kind in ('head', 'body', 'turn', 'tail')
+    for angle in SPRITE_ANGLES
+]
+SPRITE_CODES = {key: code for code, key in enumerate(SPRITE_KEYS)}
+
+
+def body_sprite(incoming, outgoing):
+    """Номер изображения элемента тела по направлениям входа и выхода."""
+    if incoming == outgoing:
+        # Прямое тело: вертикальное или горизонтальное
+        return SPRITE_CODES['body', 0 if incoming[0] == 0 else 90]
+    delta = (incoming[0] + outgoing[0], incoming[1] + outgoing[1])
+    return SPRITE_CODES['turn', SNAKE_BODY_TURN_RULES[delta, outgoing]]
+
+
+# Номера изображений по кодам направлений из SnakeModel.codes:
+# голова - по направлению входа, хвост - по направлению выхода,
+# тело - по коду входа * 4 + код выхода (разворот невозможен, там 0)
+HEAD_SPRITES = bytes(SPRITE_CODES['head', IMG_TURN[direction]]
+                     for direction in DIRECTIONS)
+TAIL_SPRITES = bytes(SPRITE_CODES['tail', IMG_TURN[-dx, -dy]]
+                     for dx, dy in DIRECTIONS)
+BODY_SPRITES = bytes(
+    0 if incoming == (-outgoing[0], -outgoing[1])
+    else body_sprite(incoming, outgoing)
+    for incoming in DIRECTIONS for outgoing in DIRECTIONS
+)
+
 # Правила поворота змейки:
 TURN_RULES = {
     (pygame.K_UP, LEFT): UP,
@@ -76,42 +184,203 @@ TURN_RULES = {
     (pygame.K_RIGHT, DOWN): RIGHT,
 }
 
+# Клавиши поворота, только они попадают в очередь нажатий
+TURN_KEYS = frozenset(key for key, _ in TURN_RULES)
+
 # Цвет фона - черный:
 BOARD_BACKGROUND_COLOR = (0, 0, 0)
 
 # Цвет границы ячейки
 BORDER_COLOR = (93, 216, 228)
 
+# Рисуется ли на фоне поля сетка ячеек цветом BORDER_COLOR
+BOARD_GRID = False
+
+# Цвет стен уровня
+WALL_COLOR = (120, 120, 120)
+
 # Цвет яблока
 APPLE_COLOR = (255, 0, 0)
 
 # Цвет змейки
 SNAKE_COLOR = (0, 255, 0)
 
-# Скорость движения змейки:
-SPEED_START = 10
-
-# Коэффициент прибавки скорости за каждое яблоко (+3%)
-SPEED_COEFFICIENT = 1
 
-# Настройка игрового окна:
-screen = pygame.display.set_mode((BOARD_WIDTH,
-                                  BOARD_HEIGHT + INFO_BOARD_HEIGHT),
-                                 0,
-                                 32)
-
-# Заголовок окна игрового поля:
-pygame.display.set_caption('Змейка')
+class Camera:
+    """Видимая часть игрового мира.
+
+    Хранит левую верхнюю ячейку окна. Мир замкнут, поэтому окно может
+    переходить через его край.
+    """
+
+    def __init__(self, world_width=WORLD_WIDTH, world_height=WORLD_HEIGHT,
+                 width=VIEW_WIDTH, height=VIEW_HEIGHT, margin=CAMERA_MARGIN):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.width = min(width, world_width)
+        self.height = min(height, world_height)
+        self.margin = margin
+        self.x = 0
+        self.y = 0
+
+    def to_screen(self, position):
+        """Координаты ячейки на экране или None, если ячейка не видна."""
+        dx = (position[0] - self.x) % self.world_width
+        dy = (position[1] - self.y) % self.world_height
+        if dx >= self.width or dy >= self.height:
+            return None
+        return dx * GRID_SIZE, dy * GRID_SIZE
+
+    def center_on(self, position):
+        """Ставим ячейку в центр окна, если мир больше окна."""
+        if self.world_width > self.width:
+            self.x = (position[0] - self.width // 2) % self.world_width
+        if self.world_height > self.height:
+            self.y = (position[1] - self.height // 2) % self.world_height
+
+    def follow(self, position):
+        """Перемещение камеры, когда ячейка подошла к краю окна.
+
+        Возвращает True, если камера переместилась.
+        """
+        dx = (position[0] - self.x) % self.world_width
+        dy = (position[1] - self.y) % self.world_height
+        inside_x = (self.world_width == self.width
+                    or self.margin <= dx < self.width - self.margin)
+        inside_y = (self.world_height == self.height
+                    or self.margin <= dy < self.height - self.margin)
+        if inside_x and inside_y:
+            return False
+        self.center_on(position)
+        return True
+
+    def visible_cells(self):
+        """Видимые ячейки мира и их координаты на экране."""
+        for dy in range(self.height):
+            y = (self.y + dy) % self.world_height
+            for dx in range(self.width):
+                yield ((self.x + dx) % self.world_width, y), (
+                    dx * GRID_SIZE, dy * GRID_SIZE)
+
+
+# Момент начала загрузки игры, от него считается время до первого кадра
+start_time = time.perf_counter()
+
+# Журнал игры: время до первого кадра и статистика ожидания событий
+logger = logging.getLogger(__name__)
+
+# Кадр игры. Окно открывается только при запуске игры (open_window), а до
+# этого кадр рисуется в памяти:
+screen = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT + INFO_BOARD_HEIGHT),
+                        0, 32)
 
 # Настройка времени:
 clock = pygame.time.Clock()
 
+# Камера, через которую рисуются все игровые объекты
+camera = Camera()
+
+# Общие для всех объектов спрайты, загружаются при первом обращении
+assets = AssetManager(angles=SPRITE_ANGLES, size=GRID_SIZE,
+                      atlas_file=ATLAS_FILE)
+
+
+def build_background(grid=BOARD_GRID):
+    """Фон поля с сеткой, он рисуется один раз.
+
+    Камера сдвигается на целые ячейки, поэтому фон окна не зависит от её
+    положения, и любую ячейку можно очистить копированием из фона.
+    """
+    surface = pygame.Surface((BOARD_WIDTH, BOARD_HEIGHT), 0, screen)
+    surface.fill(BOARD_BACKGROUND_COLOR)
+    if grid:
+        for x in range(0, BOARD_WIDTH, GRID_SIZE):
+            for y in range(0, BOARD_HEIGHT, GRID_SIZE):
+                pygame.draw.rect(surface, BORDER_COLOR,
+                                 (x, y, GRID_SIZE, GRID_SIZE), 1)
+    return surface
+
+
+# Фон поля, из которого восстанавливаются очищенные ячейки
+background = build_background()
+
+# Залитые ячейки с рамкой для draw_cell: цвет -> поверхность
+cell_surfaces = {}
+
+# Загруженные шрифты: размер -> шрифт
+fonts = {}
+
+
+def load_font(size):
+    """Шрифт по умолчанию нужного размера, загружается один раз."""
+    font = fonts.get(size)
+    if font is None:
+        font = fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+def paint_walls(level):
+    """Фон поля со стенами видимой части уровня.
+
+    Стены рисуются на фоне заново только при сдвиге камеры, а если мир
+    помещается в окно - один раз за игру.
+    """
+    global background
+    background = build_background()
+    if level is None:
+        return
+    tile = cell_surface(WALL_COLOR)
+    walls = level.walls
+    for (x, y), pixels in camera.visible_cells():
+        if walls[y * level.width + x]:
+            background.blit(tile, pixels)
+
+
+def preload_assets():
+    """Загрузка изображений и шрифтов, например в фоновом потоке."""
+    assets.load()
+    for size in (INFO_BOARD_FONT_SIZE, INFO_BOARD_GAME_OVER_FONT_SIZE,
+                 PROFILER_FONT_SIZE):
+        load_font(size)
+
+
+def open_window(preload=None):
+    """Открытие окна игры, если оно еще не открыто.
+
+    Всё, что уже нарисовано в кадре, переносится в окно, а фон поля и
+    атлас спрайтов переводятся в формат окна. preload - поток загрузки,
+    который нужно дождаться перед переводом атласа.
+    """
+    global screen, background
+    if screen is pygame.display.get_surface():
+        return
+    window = pygame.display.set_mode(screen.get_size(), 0, 32)
+    pygame.display.set_caption('Змейка')
+    window.blit(screen, (0, 0))
+    screen = window
+    background = background.convert(window)
+    cell_surfaces.clear()
+    if preload is not None:
+        preload.join()
+    assets.convert()
+
+
+def cell_surface(color):
+    """Залитая цветом ячейка с рамкой, рисуется один раз на цвет."""
+    surface = cell_surfaces.get(color)
+    if surface is None:
+        surface = pygame.Surface((GRID_SIZE, GRID_SIZE), 0, screen)
+        surface.fill(color)
+        pygame.draw.rect(surface, BORDER_COLOR, surface.get_rect(), 1)
+        cell_surfaces[color] = surface
+    return surface
+
 
 class GameObject:
     """Общий класс для игровых объектов."""
 
     def __init__(self,
-                 position=BOARD_CENTER,
+                 position=GRID_CENTER,
                  body_color=BOARD_BACKGROUND_COLOR
                  ):
         self.position = position
@@ -119,188 +388,152 @@ class GameObject:
 
     def draw_rect(self, color, rect, size=0):
         """Отрисовка прямоугольника."""
-        pygame.draw.rect(screen, color, rect, size)
+        return pygame.draw.rect(screen, color, rect, size)
 
     def draw_cell(self, cell_position):
         """Метод для отрисовки одной ячейки."""
-        rect = pygame.Rect(cell_position, (GRID_SIZE, GRID_SIZE))
-        self.draw_rect(self.body_color, rect)
-        self.draw_rect(BORDER_COLOR, rect, 1)
+        pixels = camera.to_screen(cell_position)
+        if pixels is None:
+            return None
+        return screen.blit(cell_surface(self.body_color), pixels)
+
+    def restore_background(self, rect):
+        """Очистка прямоугольника поля копированием из фона."""
+        return screen.blit(background, rect, rect)
 
     def draw(self):
-        """Отрисовка."""
+        """Отрисовка.
 
+        Возвращает список измененных прямоугольников экрана.
+        """
+        return []
 
-class Apple(GameObject):
-    """Класс для Яблока."""
 
-    def randomize_position(self):
-        """Генерация рандомной позиции для Яблока."""
-        self.position = (
-            randint(0, GRID_WIDTH - 1) * GRID_SIZE,
-            randint(0, GRID_HEIGHT - 1) * GRID_SIZE
-        )
+class Apple(GameObject, AppleModel):
+    """Класс для Яблока."""
 
-    def __init__(self):
-        self.randomize_position()
+    def __init__(self, width=WORLD_WIDTH, height=WORLD_HEIGHT):
+        AppleModel.__init__(self, width, height)
         self.body_color = APPLE_COLOR
-        self.surf = pygame.image.load(APPLE_IMG).convert_alpha()
-        super().__init__(self.position, self.body_color)
+        self.surf = assets.sprite('apple')
+        GameObject.__init__(self, self.position, self.body_color)
 
     def draw(self):
         """Отрисовка."""
-        apple_rect = self.surf.get_rect(topleft=self.position)
-        screen.blit(self.surf, apple_rect)
+        pixels = camera.to_screen(self.position)
+        if pixels is None:
+            return []
+        return [screen.blit(self.surf, pixels)]
 
 
-class Snake(GameObject):
+class Snake(GameObject, SnakeModel):
     """Класс для Змеи."""
 
     def clear_screan(self):
         """Очистка области экрана где ползает змейка."""
-        rect = (pygame.Rect((0, 0), (BOARD_WIDTH, BOARD_HEIGHT)))
-        self.draw_rect(BOARD_BACKGROUND_COLOR, rect)
+        return screen.blit(background, (0, 0))
 
-    def reset(self):
+    def reset(self, start=None):
         """Сброс Змейки."""
-        self.positions = [BOARD_CENTER]
-        self.direction = RIGHT
-        self.next_direction = None
-        self.last = False
-        self.speed = SPEED_START
+        SnakeModel.reset(self, start)
+        # Какое изображение нарисовано в каждой ячейке мира
+        self.cell_sprites = bytearray(self.board.width * self.board.height)
         # Очищаем поле где ползает змейка
         self.clear_screan()
 
-    def __init__(self, position=BOARD_CENTER, body_color=SNAKE_COLOR):
-        self.reset()
-        # Загрузка изображений змейки
-        self.surf_body = pygame.image.load(SNAKE_BODY_IMG).convert_alpha()
-        self.surf_head = pygame.image.load(SNAKE_HEAD_IMG).convert_alpha()
-        self.surf_tail = pygame.image.load(SNAKE_TAIL_IMG).convert_alpha()
-        self.surf_turn = pygame.image.load(SNAKE_TURN_IMG).convert_alpha()
-        super().__init__(position, body_color)
-
-    def get_head_position(self):
-        """Получение координат головы змейки."""
-        return self.positions[0]
-
-    def get_second_position(self):
-        """Получение координат головы змейки."""
-        return self.positions[1]
-
-    def get_third_position(self):
-        """Получение координат головы змейки."""
-        return self.positions[2]
-
-    def get_tail_position(self):
-        """Получение координат хвоста змейки."""
-        return self.positions[len(self.positions) - 1]
-
-    def get_pre_tail_position(self):
-        """Получение координат хвоста змейки."""
-        return self.positions[len(self.positions) - 2]
-
-    def move(self):
-        """Двигаем змейку на следующую клетку."""
-        head_x, head_y = self.get_head_position()
-        new_head_x = head_x + self.direction[0] * GRID_SIZE
-        new_head_y = head_y + self.direction[1] * GRID_SIZE
-        new_head_pos = (new_head_x % BOARD_WIDTH, new_head_y % BOARD_HEIGHT)
-        self.positions.insert(0, new_head_pos)
-        self.last = self.positions.pop()
-
-    def update_direction(self):
-        """Обновление позиции."""
-        if self.next_direction:
-            self.direction = self.next_direction
-            self.next_direction = None
-
-    @staticmethod
-    def crop_delta_xy(delta):
-        """Проверяем прохождение стенки"""
-        if delta < -1:
-            return -1
-        elif delta > 1:
-            return 1
-        else:
-            return delta
+    def __init__(self, position=GRID_CENTER, body_color=SNAKE_COLOR,
+                 board=None):
+        SnakeModel.__init__(self, board)
+        # Повернутые изображения: (вид элемента, угол) -> поверхность
+        self.sprites = self.build_sprites()
+        GameObject.__init__(self, position, body_color)
 
-    def delta_xy(self, first_position, second_position):
-        """Подсчитываем разницу координат"""
-        delta_x = (first_position[0] - second_position[0]) // GRID_SIZE
-        delta_y = (first_position[1] - second_position[1]) // GRID_SIZE
-        delta_x = self.crop_delta_xy(delta_x)
-        delta_y = self.crop_delta_xy(delta_y)
-        return delta_x, delta_y
+    def build_sprites(self):
+        """Повернутые изображения змейки для всех углов из общего атласа."""
+        return {key: assets.sprite(*key) for key in SPRITE_KEYS[1:]}
 
     def clear_cell(self, position):
-        """Метод для закраски элемента в цвет фона."""
-        rect = pygame.Rect(position, (GRID_SIZE, GRID_SIZE))
-        self.draw_rect(BOARD_BACKGROUND_COLOR, rect)
+        """Очистка ячейки элемента до фона поля."""
+        self.cell_sprites[self.board.index(position)] = 0
+        pixels = camera.to_screen(position)
+        if pixels is None:
+            return None
+        return self.restore_background(
+            pygame.Rect(pixels, (GRID_SIZE, GRID_SIZE)))
+
+    def draw_sprite(self, code, cell):
+        """Отрисовка изображения змейки с номером code, если ячейка видна.
+
+        Изображение запоминается для ячейки даже за пределами окна, чтобы
+        при перемещении камеры видимую часть можно было нарисовать заново.
+        """
+        self.cell_sprites[cell] = code
+        pixels = camera.to_screen(self.board.position(cell))
+        if pixels is None:
+            return None
+        rect = self.restore_background(
+            pygame.Rect(pixels, (GRID_SIZE, GRID_SIZE)))
+        screen.blit(self.sprites[SPRITE_KEYS[code]], rect)
+        return rect
+
+    def paint_body(self):
+        """Запись изображений всех элементов змейки в cell_sprites.
+
+        Нужна, когда тело сменилось целиком, например после
+        GameEngine.restore. Изображения берутся из таблиц по кодам
+        направлений, без вычислений по координатам.
+        """
+        cell_sprites = self.cell_sprites
+        cell_sprites[:] = bytes(len(cell_sprites))
+        codes = self.codes
+        capacity = len(codes)
+        slot = self.head_slot
+        outgoing = codes[slot]
+        cell_sprites[self.cells[slot]] = HEAD_SPRITES[outgoing]
+        for _ in range(self.length - 2):
+            slot = (slot - 1) % capacity
+            incoming = codes[slot]
+            cell_sprites[self.cells[slot]] = BODY_SPRITES[
+                incoming * 4 + outgoing]
+            outgoing = incoming
+        if self.length > 1:
+            slot = (slot - 1) % capacity
+            cell_sprites[self.cells[slot]] = TAIL_SPRITES[outgoing]
+
+    def draw_visible(self):
+        """Отрисовка всех видимых элементов змейки на чистом поле."""
+        board = self.board
+        for position, pixels in camera.visible_cells():
+            code = self.cell_sprites[board.index(position)]
+            if code:
+                screen.blit(self.sprites[SPRITE_KEYS[code]], pixels)
 
     def draw(self):
-        """Отрисовка змеи."""
+        """Отрисовка змеи.
+
+        Перерисовываются только голова, второй элемент, хвост и
+        освободившаяся ячейка. Возвращает их прямоугольники.
+        """
+        rects = []
+        # Затирание последнего сегмента, пока туда не нарисовали голову
+        if self.last:
+            rects.append(self.clear_cell(self.last))
+
         # Отрисовка головы
-        head_position = self.get_head_position()
-        head_rect = self.surf_head.get_rect(topleft=head_position)
-        rotate = pygame.transform.rotate(self.surf_head, IMG_TURN[self.direction])
-        screen.blit(rotate, head_rect)
-
-        # Отрисовка второго элемента змейки
-        if len(self.positions) > 2:
-            second_position = self.get_second_position()
-            third_position = self.get_third_position()
-            # Очистка второго элемента змейки
-            self.clear_cell(second_position)
-            # Определеяем какое изображение будет на втором элменте
-            turn_rect = None
-            if head_position[0] == second_position[0] == third_position[0]:
-                # Вертикальное тело
-                angle = 0
-            elif head_position[1] == second_position[1] == third_position[1]:
-                # Горизонтальное тело
-                angle = 90
-            else:
-                # Поворотное тело
-                turn_rect = self.surf_turn.get_rect(topleft=second_position)
-            # Отрисовка
-            if turn_rect is None:
-                # Отрисовка вертикального или горизонтального тела
-                body_rect = self.surf_body.get_rect(topleft=second_position)
-                rotate_body = pygame.transform.rotate(self.surf_body, angle)
-                screen.blit(rotate_body, body_rect)
-            else:
-                # Отрисовка поворотного тела
-                angle = SNAKE_BODY_TURN_RULES[self.delta_xy(head_position, third_position), self.direction]
-                if (abs(head_position[0] - second_position[0]) > GRID_SIZE) or (
-                   head_position[1] - second_position[1] > GRID_SIZE):
-                    print('ПРОШЛИ СТЕНКУ')
-                    # ТУТ НАДО ДОРАБОТАТЬ УГОЛ
-                    
-                rotate_turn = pygame.transform.rotate(
-                    self.surf_turn,
-                    angle)
-                screen.blit(rotate_turn, turn_rect)
+        head_code = self.code(0)
+        rects.append(self.draw_sprite(HEAD_SPRITES[head_code],
+                                      self.head_cell()))
+
+        # Отрисовка второго элемента змейки: прямого или поворотного
+        if self.length > 2:
+            rects.append(self.draw_sprite(
+                BODY_SPRITES[self.code(1) * 4 + head_code], self.cell(1)))
 
         # Отрисовка хвоста
-        tail_position = self.get_tail_position()
-        if tail_position != head_position:
-            # Очистка хвостового квадратика в цвет фона
-            self.clear_cell(tail_position)
-            # Отрисовка изображения хвоста
-            pre_tail_position = self.get_pre_tail_position()
-            tail_rect = self.surf_tail.get_rect(topleft=tail_position)
-            delta_x, delta_y = self.delta_xy(tail_position, pre_tail_position)
-            angle = IMG_TURN[delta_x, delta_y]
-            if (abs(tail_position[0] - pre_tail_position[0]) > GRID_SIZE) or (
-               abs(tail_position[1] - pre_tail_position[1]) > GRID_SIZE):
-                angle += 180
-            rotate = pygame.transform.rotate(self.surf_tail, angle)
-            screen.blit(rotate, tail_rect)
-
-        # Затирание последнего сегмента
-        if self.last:
-            self.clear_cell(self.last)
+        if self.length > 1:
+            rects.append(self.draw_sprite(TAIL_SPRITES[self.code(-2)],
+                                          self.cell(-1)))
+        return [rect for rect in rects if rect is not None]
 
 
 class InfoBoard(GameObject):
@@ -309,130 +542,568 @@ class InfoBoard(GameObject):
     def __init__(self,
                  score=0,
                  speed=SPEED_START):
-        self.font = pygame.font.Font(None, INFO_BOARD_FONT_SIZE)
-        self.game_over_font = pygame.font.Font(None,
-                                               INFO_BOARD_GAME_OVER_FONT_SIZE
-                                               )
+        self.font = load_font(INFO_BOARD_FONT_SIZE)
+        self.game_over_font = load_font(INFO_BOARD_GAME_OVER_FONT_SIZE)
+        self.rect = pygame.Rect((0, BOARD_HEIGHT),
+                                (BOARD_WIDTH, INFO_BOARD_HEIGHT))
+        # Всё, что не меняется, рисуем один раз:
+        # фон с рамкой и подписями, цифры и надписи конца игры
+        self.score_label = self.font.render('СЧЁТ: ', True,
+                                            INFO_BOARD_FONT_COLOR)
+        self.speed_label = self.font.render('CКОРОСТЬ: ', True,
+                                            INFO_BOARD_FONT_COLOR)
+        # Места подписей на экране, за ними печатаются числа
+        self.score_rect = self.score_label.get_rect(
+            topleft=(INFO_BOARD_BORDER_SIZE * 2,
+                     INFO_BOARD_BORDER_SIZE * 2 + BOARD_HEIGHT))
+        self.speed_rect = self.speed_label.get_rect(
+            topleft=(INFO_BOARD_BORDER_SIZE * 2,
+                     INFO_BOARD_BORDER_SIZE * 2 + BOARD_HEIGHT
+                     + INFO_BOARD_FONT_SIZE))
+        self.panel = self.build_panel()
+        self.digits = [
+            self.font.render(str(digit), True, INFO_BOARD_FONT_COLOR)
+            for digit in range(10)
+        ]
+        self.game_over_texts = self.build_game_over_texts()
+        self.pause_text = self.font.render('ПАУЗА', True,
+                                           INFO_BOARD_GAME_OVER_FONT_COLOR)
+        self.profile_font = load_font(PROFILER_FONT_SIZE)
+        # Строки с результатами замера фаз, None - замер выключен
+        self.profile_lines = None
         self.score = score
         self.speed = speed
         self.set_score_and_speed(self.score, self.speed)
 
-    def clean_screen(self):
-        """Очистка экрана с информацией."""
-        rect = pygame.Rect((0, BOARD_HEIGHT), (BOARD_WIDTH, INFO_BOARD_HEIGHT))
+    def build_panel(self):
+        """Подготовка фона экрана с информацией с рамкой и подписями."""
+        panel = pygame.Surface(self.rect.size)
+        rect = panel.get_rect()
         # Отрисоква фона
-        self.draw_rect(INFO_BOARD_BACKGROUND_COLOR, rect)
+        panel.fill(INFO_BOARD_BACKGROUND_COLOR)
         # Отрисовка двойной рамки
-        self.draw_rect(INFO_BOARD_BORDER1_COLOR, rect, INFO_BOARD_BORDER_SIZE)
-        self.draw_rect(INFO_BOARD_BORDER2_COLOR, rect, INFO_BOARD_BORDER_SIZE // 2)
+        pygame.draw.rect(panel, INFO_BOARD_BORDER1_COLOR, rect,
+                         INFO_BOARD_BORDER_SIZE)
+        pygame.draw.rect(panel, INFO_BOARD_BORDER2_COLOR, rect,
+                         INFO_BOARD_BORDER_SIZE // 2)
+        # Подписи к счёту и скорости
+        for label, label_rect in ((self.score_label, self.score_rect),
+                                  (self.speed_label, self.speed_rect)):
+            panel.blit(label, label_rect.move(0, -self.rect.top))
+        return panel
+
+    def build_game_over_texts(self):
+        """Подготовка надписей об окончании игры и их положения."""
+        text_1 = self.game_over_font.render('ИГРА ЗАКОНЧЕНА',
+                                            True,
+                                            INFO_BOARD_GAME_OVER_FONT_COLOR)
+        text_2 = self.font.render('Нажмите "Пробел" чтобы начать заново',
+                                  True,
+                                  INFO_BOARD_GAME_OVER_FONT_COLOR)
+        text_1_rect = text_1.get_rect(center=BOARD_CENTER)
+        text_2_rect = text_2.get_rect(
+            center=(BOARD_CENTER[0],
+                    BOARD_CENTER[1] + INFO_BOARD_GAME_OVER_FONT_SIZE))
+        return (text_1, text_1_rect), (text_2, text_2_rect)
+
+    def clean_screen(self):
+        """Очистка экрана с информацией."""
+        return screen.blit(self.panel, self.rect)
 
-    def text_render(self, text, position):
-        """Печать текста"""
-        screen.blit(self.font.render(text, True, INFO_BOARD_FONT_COLOR), position)
+    def number_render(self, number, label_rect):
+        """Печать числа после подписи из заранее отрисованных цифр."""
+        x = label_rect.right
+        for digit in str(number):
+            glyph = self.digits[int(digit)]
+            # Цифры выравниваем по нижнему краю подписи
+            x += screen.blit(glyph, glyph.get_rect(
+                bottomleft=(x, label_rect.bottom))).width
 
     def draw_score(self):
         """Отрисовка экрана с информацией."""
-        self.clean_screen()
-        # Печатаем счёт
-        self.text_render(f'СЧЁТ: {self.score}',
-                         [INFO_BOARD_BORDER_SIZE * 2,
-                          INFO_BOARD_BORDER_SIZE * 2 + BOARD_HEIGHT])
-        # Печатаем скорость
-        self.text_render(f'CКОРОСТЬ: {self.speed}',
-                         [INFO_BOARD_BORDER_SIZE * 2,
-                          INFO_BOARD_BORDER_SIZE * 2 + BOARD_HEIGHT + INFO_BOARD_FONT_SIZE])
+        rect = self.clean_screen()
+        # Печатаем счёт и скорость, подписи уже есть на фоне
+        self.number_render(self.score, self.score_rect)
+        self.number_render(self.speed, self.speed_rect)
+        if self.profile_lines is not None:
+            self.print_profile()
+        return rect
+
+    def draw_profile(self, summary):
+        """Отрисовка перцентилей фаз кадра поверх экрана с информацией.
+
+        Для каждой фазы печатаются p50, p95 и p99: время в микросекундах,
+        память - в блоках и байтах.
+        """
+        self.profile_lines = []
+        for phase, values in summary.items():
+            scale = 1 if phase in (MEMORY_BLOCKS, MEMORY_PEAK) else 1000
+            self.profile_lines.append(f'{phase}: ' + ' '.join(
+                str(value // scale) for value in values.values()))
+        return self.draw_score()
+
+    def print_profile(self):
+        """Печать строк с результатами замера в несколько колонок."""
+        top = self.rect.top + INFO_BOARD_BORDER_SIZE * 2
+        line_height = self.profile_font.get_linesize()
+        rows = ((self.rect.height - INFO_BOARD_BORDER_SIZE * 4)
+                // line_height)
+        column_width = ((self.rect.right - INFO_BOARD_BORDER_SIZE * 2
+                         - PROFILER_OVERLAY_X) // PROFILER_OVERLAY_COLUMNS)
+        for number, line in enumerate(self.profile_lines):
+            column, row = divmod(number, rows)
+            text = self.profile_font.render(line, True,
+                                            INFO_BOARD_FONT_COLOR)
+            screen.blit(text, (PROFILER_OVERLAY_X + column * column_width,
+                               top + row * line_height))
 
     def set_score_and_speed(self, new_score, new_speed):
         """Установка счета и скорости и их отрисовка"""
         self.score = new_score
         self.speed = new_speed
-        self.draw_score()
+        return self.draw_score()
 
     def print_game_over(self):
         """Отрисовка надписи об окончание игры"""
-        text_string_1 = 'ИГРА ЗАКОНЧЕНА'
-        text_string_2 = 'Нажмите "Пробел" чтобы начать заново'
-        # Создание текстовой поверхности
-        text_1 = self.game_over_font.render(text_string_1,
-                                            True,
-                                            INFO_BOARD_GAME_OVER_FONT_COLOR)
-        text_2 = self.font.render(text_string_2,
-                                  True,
-                                  INFO_BOARD_GAME_OVER_FONT_COLOR)
-        # Получение прямоугольника текста и установка его позиции
-        text_1_rect = text_1.get_rect(center=BOARD_CENTER)
-        text_2_rect = text_2.get_rect(center=(BOARD_CENTER[0], BOARD_CENTER[1] + INFO_BOARD_GAME_OVER_FONT_SIZE))
-        # Отображение текста на экране
-        screen.blit(text_1, text_1_rect)
-        screen.blit(text_2, text_2_rect)
-
-
-def handle_keys(game_object):
-    """Обработка событий в игре."""
+        for text, text_rect in self.game_over_texts:
+            screen.blit(text, text_rect)
+
+    def print_pause(self):
+        """Отрисовка надписи о паузе в правой части экрана с информацией"""
+        text_rect = self.pause_text.get_rect(
+            topright=(self.rect.right - INFO_BOARD_BORDER_SIZE * 2,
+                      self.rect.top + INFO_BOARD_BORDER_SIZE * 2))
+        screen.blit(self.pause_text, text_rect)
+        return self.rect
+
+
+def handle_keys(game_object, key_queue=None, other_keys=None):
+    """Обработка событий в игре.
+
+    Если передана очередь key_queue, клавиши поворота складываются в неё,
+    пока в ней меньше INPUT_QUEUE_SIZE нажатий, а остальные клавиши - в
+    список other_keys. Иначе поворот змейки задается сразу. Возвращает
+    последнюю нажатую клавишу.
+    """
+    key = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             pygame.quit()
             raise SystemExit
         elif event.type == pygame.KEYDOWN:
+            key = event.key
+            if key_queue is not None:
+                if key not in TURN_KEYS:
+                    if other_keys is not None:
+                        other_keys.append(key)
+                elif len(key_queue) < INPUT_QUEUE_SIZE:
+                    key_queue.append(key)
+                continue
             new_direction = TURN_RULES.get((event.key, game_object.direction))
             if new_direction is not None:
                 game_object.next_direction = new_direction
-            return event.key
+    return key
+
+
+class IdleCounter:
+    """Счетчик времени, проведенного в ожидании событий.
+
+    Сравнивает процессорное время процесса с реальным временем ожидания,
+    чтобы было видно, что пауза и экран конца игры не грузят процессор.
+    """
+
+    def __init__(self):
+        self.waits = 0
+        self.wakeups = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    def add(self, wall_time, cpu_time, wakeups):
+        """Учет одного периода ожидания."""
+        self.waits += 1
+        self.wakeups += wakeups
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+
+    def cpu_usage(self):
+        """Доля процессора, потраченная за время ожидания."""
+        return self.cpu_time / self.wall_time if self.wall_time else 0.0
+
+    def report(self):
+        """Значения счетчика в виде словаря."""
+        return {
+            'waits': self.waits,
+            'wakeups': self.wakeups,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'cpu_usage': self.cpu_usage(),
+        }
+
+
+class GameLoop:
+    """Игровой цикл с состояниями: игра, пауза и конец игры.
+
+    Во время игры кадры рисуются с частотой FPS, а змейка делает шаг каждые
+    1 / speed секунды: накопленное за кадры время расходуется на нужное
+    число шагов. В паузе и после конца игры цикл спит в ожидании событий.
+    """
+
+    def __init__(self, game, info_board, recorder, replay_writer,
+                 results=None):
+        open_window()
+        self.game = game
+        self.snake = game.snake
+        self.apple = game.apple
+        self.info_board = info_board
+        # Запись игр, None - игры не записываются
+        self.recorder = recorder
+        self.replay_writer = replay_writer
+        self.state = STATE_PLAYING
+        # Нажатые, но еще не обработанные клавиши поворота
+        self.key_queue = deque()
+        # Остальные клавиши, нажатые за кадр
+        self.pressed_keys = []
+        # Время, которое еще не потрачено на шаги симуляции
+        self.accumulator = 0.0
+        self.idle_counter = IdleCounter()
+        self.profiler = FrameProfiler()
+        # Автопилот вместо клавиатуры, None - змейкой управляет игрок
+        self.autopilot = None
+        # Запись кадров, None - запись выключена
+        self.capture = None
+        # Секунды от start_time до первого кадра на экране
+        self.first_frame_time = None
+        # Журнал результатов игр, None - результаты не сохраняются
+        self.results = results
+        self.game_start = time.perf_counter()
+
+    def run(self):
+        """Бесконечный цикл игры."""
+        # Первый кадр выводим на экран целиком
+        self.display()
+        self.first_frame_time = time.perf_counter() - start_time
+        logger.debug('Первый кадр через %.0f мс',
+                     self.first_frame_time * 1000)
+        while True:
+            if self.state == STATE_PLAYING:
+                self.play_frame()
+            elif self.state == STATE_PAUSED:
+                self.wait_for_key(PAUSE_KEY)
+                self.resume()
+            else:
+                self.wait_for_key(pygame.K_SPACE)
+                self.restart()
+
+    def play_frame(self):
+        """Один кадр игры."""
+        self.accumulator += clock.tick(FPS) / 1000
+        handle_keys(self.snake, self.key_queue, self.pressed_keys)
+        if self.pressed_keys and self.control_keys():
+            return
+        self.display(self.update())
+
+    def profiled_frame(self):
+        """Кадр игры с замером времени каждой фазы.
+
+        Подменяет play_frame, пока замер включен.
+        """
+        profiler = self.profiler
+        profiler.start_frame()
+        self.accumulator += profiler.timed('tick', clock.tick, FPS) / 1000
+        profiler.timed('handle_keys', handle_keys, self.snake,
+                       self.key_queue, self.pressed_keys)
+        if self.pressed_keys and self.control_keys():
+            return
+        dirty_rects = self.update()
+        if profiler.frames % PROFILER_OVERLAY_FRAMES == 0:
+            dirty_rects.append(profiler.timed(
+                'info_board', self.info_board.draw_profile,
+                profiler.summary()))
+        profiler.timed('display_update', self.display, dirty_rects)
+        profiler.end_frame()
+
+    def control_keys(self):
+        """Обработка клавиш паузы и замера.
+
+        Возвращает True, если кадр дальше рисовать не нужно.
+        """
+        keys = set(self.pressed_keys)
+        self.pressed_keys.clear()
+        if PAUSE_KEY in keys:
+            self.pause()
+            return True
+        if PROFILER_KEY in keys:
+            self.toggle_profiler()
+            return True
+        if AUTOPILOT_KEY in keys:
+            self.toggle_autopilot()
+        if CAPTURE_KEY in keys:
+            self.toggle_capture()
+        if PROFILER_EXPORT_KEY in keys:
+            self.profiler.export_json(PROFILE_JSON_FILE)
+            self.profiler.export_csv(PROFILE_CSV_FILE)
+        return False
+
+    def toggle_profiler(self):
+        """Включение и выключение замера фаз кадра."""
+        profiler = self.profiler
+        info_board = self.info_board
+        if profiler.enabled:
+            profiler.disable()
+            # Возвращаем обычный кадр без замеров
+            del self.play_frame
+            info_board.profile_lines = None
+            self.display(info_board.draw_score())
+            return
+        snake, apple = self.snake, self.apple
+        profiler.enable(PROFILER_PHASES, (
+            (snake, 'update_direction', 'move'),
+            (snake, 'move', 'move'),
+            (snake, 'grow', 'move'),
+            (snake, 'check_collision', 'collision'),
+            (apple, 'randomize_position', 'apple'),
+            (apple, 'draw', 'apple_draw'),
+            (snake, 'draw', 'snake_draw'),
+            (self, 'redraw_board', 'redraw'),
+            (info_board, 'set_score_and_speed', 'info_board'),
+        ))
+        self.play_frame = self.profiled_frame
+        self.display(info_board.draw_profile(profiler.summary()))
+
+    def toggle_autopilot(self):
+        """Передача управления автопилоту и возврат его игроку."""
+        self.autopilot = (Autopilot(self.snake, self.apple)
+                          if self.autopilot is None else None)
+        # Нажатые до переключения повороты уже не нужны
+        self.key_queue.clear()
+
+    def toggle_capture(self):
+        """Включение и выключение записи кадров в папку CAPTURE_DIR."""
+        if self.capture is None:
+            self.capture = FrameCapture(screen.get_size(), CAPTURE_DIR)
+            self.capture.start()
+        else:
+            self.capture.close()
+            self.capture = None
+
+    def display(self, rects=None):
+        """Вывод кадра на экран и в запись кадров, если она включена.
+
+        rects - измененные прямоугольники, None - весь экран.
+        """
+        pygame.display.update(rects)
+        if self.capture is not None:
+            self.capture.add(screen, rects)
+
+    def wait_for_key(self, key):
+        """Ожидание нажатия клавиши без нагрузки на процессор."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        wakeups = 0
+        while True:
+            event = pygame.event.wait(IDLE_WAIT_TIMEOUT)
+            wakeups += 1
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                raise SystemExit
+            if event.type == pygame.KEYDOWN and event.key == key:
+                break
+        self.idle_counter.add(time.perf_counter() - wall_start,
+                              time.process_time() - cpu_start,
+                              wakeups)
+        logger.info('Ожидание событий: %(waits)d раз, %(wall_time).1f с, '
+                    'пробуждений %(wakeups)d, доля процессора '
+                    '%(cpu_usage).3f', self.idle_counter.report())
+
+    def update(self):
+        """Шаги симуляции за кадр, возвращает измененные прямоугольники."""
+        dirty_rects = []
+        steps = 0
+        while (self.state == STATE_PLAYING
+               and self.accumulator >= 1 / self.snake.speed):
+            if steps == MAX_STEPS_PER_FRAME:
+                # Слишком сильно отстали - не пытаемся догнать
+                self.accumulator = 0.0
+                break
+            self.accumulator -= 1 / self.snake.speed
+            steps += 1
+            self.step(dirty_rects)
+        return dirty_rects
+
+    def next_turn(self):
+        """Первый поворот из очереди, допустимый по TURN_RULES.
+
+        Если включен автопилот, поворот выбирает он.
+        """
+        if self.autopilot is not None:
+            # Нажатия игрока при автопилоте не копятся
+            self.key_queue.clear()
+            return self.autopilot()
+        while self.key_queue:
+            new_direction = TURN_RULES.get((self.key_queue.popleft(),
+                                            self.snake.direction))
+            if new_direction is not None:
+                return new_direction
+        return None
+
+    def step(self, dirty_rects):
+        """Один шаг игры и его отрисовка."""
+        # Двигаем змейку и проверяем столкновения с Яблоком и своим телом
+        state, events = self.game.step(self.next_turn())
+        if self.recorder is not None:
+            self.recorder.record(state)
+        if EVENT_APPLE in events:
+            # Обновляем счет и скорость и отрисовываем
+            dirty_rects.append(self.info_board.set_score_and_speed(
+                state.score, round(state.speed)))
+        if state.game_over:
+            self.game_over()
+            return
+        # Отрисовка
+        dirty_rects.extend(self.apple.draw())
+        dirty_rects.extend(self.snake.draw())
+        if camera.follow(state.head):
+            dirty_rects.append(self.redraw_board())
+
+    def redraw_board(self):
+        """Отрисовка видимой части поля заново после сдвига камеры."""
+        level = self.snake.board.level
+        if level is not None:
+            paint_walls(level)
+        rect = self.snake.clear_screan()
+        self.snake.draw_visible()
+        self.apple.draw()
+        return rect
+
+    def pause(self):
+        """Переход в паузу."""
+        self.state = STATE_PAUSED
+        self.key_queue.clear()
+        self.display(self.info_board.print_pause())
+
+    def resume(self):
+        """Продолжение игры после паузы."""
+        self.state = STATE_PLAYING
+        # Время паузы не должно превратиться в шаги симуляции
+        clock.tick()
+        self.accumulator = 0.0
+        self.display(self.info_board.draw_score())
+
+    def game_over(self):
+        """Конец игры: сохраняем запись и пишем об этом на экране."""
+        self.state = STATE_GAME_OVER
+        if self.recorder is not None:
+            self.replay_writer.write(self.recorder.finish())
+        if self.results is not None:
+            self.results.add(game_record(
+                self.game, time.perf_counter() - self.game_start))
+        # Пишем на экране что это конец игры
+        # Перед этим закрашиваем игровую области
+        self.snake.clear_screan()
+        self.info_board.print_game_over()
+        self.display()
+
+    def finish(self):
+        """Сохранение игры, прерванной закрытием окна."""
+        # Законченная игра уже записана в game_over
+        if self.recorder is not None and self.state != STATE_GAME_OVER:
+            self.replay_writer.write(self.recorder.finish())
+
+    def restart(self):
+        """Новая игра после нажатия пробела."""
+        self.state = STATE_PLAYING
+        # Сбрасываем змейку, яблоко и счёт
+        self.game.reset()
+        if self.recorder is not None:
+            self.recorder.start()
+        self.game_start = time.perf_counter()
+        self.key_queue.clear()
+        clock.tick()
+        self.accumulator = 0.0
+        # Обновляем счет и скорость и отрисовываем
+        self.info_board.set_score_and_speed(0, round(self.snake.speed))
+        camera.center_on(self.snake.get_head_position())
+        self.snake.draw()
+        self.redraw_board()
+        self.display()
+
+
+def render_replay(replay, capture):
+    """Отрисовка записанной игры в запись кадров, кадр на каждый шаг.
+
+    Окно не нужно: с видеодрайвером dummy игра рисуется в память, и
+    кадры отдаются в capture без пропусков.
+    """
+    if (replay.width, replay.height) != (camera.world_width,
+                                         camera.world_height):
+        raise ValueError('Игра записана на поле другого размера.')
+    snake = Snake(board=Board(replay.width, replay.height))
+    apple = Apple(replay.width, replay.height)
+    game = GameEngine(snake, apple, replay.seed)
+    info_board = InfoBoard()
+    for state, events in playback(replay, game):
+        if state.game_over:
+            break
+        rects = []
+        if EVENT_APPLE in events:
+            rects.append(info_board.set_score_and_speed(
+                state.score, round(state.speed)))
+        rects.extend(apple.draw())
+        rects.extend(snake.draw())
+        first = state.ticks == 1
+        if first:
+            camera.center_on(state.head)
+        if camera.follow(state.head) or first:
+            # Первый кадр и кадр после сдвига камеры рисуются целиком
+            snake.clear_screan()
+            snake.draw_visible()
+            apple.draw()
+            info_board.draw_score()
+            rects = None
+        capture.add(screen, rects, wait=True)
 
 
 def main():
     """Main."""
-    # Инициализация PyGame:
-    pygame.init()
+    # Инициализация только нужных частей PyGame: окна с событиями и шрифтов
+    pygame.display.init()
+    pygame.font.init()
+    # Изображения и шрифты загружаются, пока открывается окно
+    preload = threading.Thread(target=preload_assets, daemon=True)
+    preload.start()
+    open_window(preload)
+
+    # Поле со стенами уровня, если он задан
+    level = None if LEVEL_FILE is None else Level.load(LEVEL_FILE)
+    board = Board(WORLD_WIDTH, WORLD_HEIGHT, level)
+    camera.center_on(board.center)
+    # Стены попадают на фон поля до первой отрисовки змейки
+    paint_walls(level)
 
     # Создаем экземпляры классов.
-    snake_object = Snake()
-    apple_object = Apple()
+    snake_object = Snake(board=board)
+    apple_object = Apple(WORLD_WIDTH, WORLD_HEIGHT)
+    # Правила игры работают с теми же объектами, что и отрисовка
+    game = GameEngine(snake_object, apple_object)
     info_board = InfoBoard()
-
-    while True:
-        # Задержка
-        clock.tick(round(snake_object.speed))
-        # Считываем нажатие клавиатуры
-        handle_keys(snake_object)
-        # Обновляем и двигаем змейку
-        snake_object.update_direction()
-        snake_object.move()
-        # Проверка столкновения головы с Яблоком и с своим телом
-        head_position = snake_object.get_head_position()
-        if head_position == apple_object.position:
-            # Обрабатываем событие когда змея съела яблоко
-            # Добавляем к хвосту змеи последний удаленный элемент
-            snake_object.positions.append(snake_object.last)
-            # Увелививаем скорость змейки
-            snake_object.speed *= 1 + SPEED_COEFFICIENT / 100
-            # Обновляем счет и скорость и отрисовываем
-            info_board.set_score_and_speed(info_board.score + 1, round(snake_object.speed))
-            # Генерируем новое положение яблока
-            while True:
-                apple_object.randomize_position()
-                if apple_object.position not in snake_object.positions:
-                    break
-        elif head_position in snake_object.positions[3:]:
-            # Обрабатываем событие когда змея врезалась в себя
-            # Пишем на экране что это конец игры
-            # Перед этим закрашиваем игровую области
-            snake_object.clear_screan()
-            info_board.print_game_over()
-            pygame.display.update()
-            # Ожидаем нажатия пробела чтобы начать заново игру
-            while handle_keys(snake_object) != pygame.K_SPACE:
-                pass
-            # Сбрасываем змейку
-            snake_object.reset()
-            # Устанавливаем новое яблоко
-            apple_object.randomize_position()
-            # Обновляем счет и скорость и отрисовываем
-            info_board.set_score_and_speed(0, round(snake_object.speed))
-        # Отрисовка
-        apple_object.draw()
-        snake_object.draw()
-        pygame.display.update()
+    # Запись игр для их точного повтора. В записи нет стен уровня, и
+    # повтор разошелся бы с игрой, поэтому игры на уровне не записываются
+    recorder = replay_writer = None
+    if level is None:
+        recorder = ReplayRecorder(game)
+        replay_writer = ReplayWriter(REPLAY_FILE)
+    results = ResultLog(RESULTS_FILE)
+    game_loop = GameLoop(game, info_board, recorder, replay_writer, results)
+    try:
+        game_loop.run()
+    except SystemExit:
+        # Сохраняем игру, которую прервали закрытием окна
+        game_loop.finish()
+        if game_loop.capture is not None:
+            game_loop.capture.close()
+        raise
+    finally:
+        results.close()
 
 
 if __name__ == '__main__':